@@ -94,9 +94,8 @@ class EEGProcessing:
         for cond in ['Anode','Cathode','Sham','Visual']:
             #Now we can iterate through all of the directories
             for path in directories:
-                os.chdir(path)
                 #We want to then iterate through all the files
-                for f in os.listdir():
+                for f in os.listdir(path):
                     if not f.endswith('.tfc'):
                         #we don't want to read this so continue
                         continue
@@ -105,7 +104,7 @@ class EEGProcessing:
                     #we want to first load in the sources
                     if DEBUG:
                         print(f)
-                    tfc = self.loadtfc(f)
+                    tfc = self.loadtfc(os.path.join(path,f))
                     try:
                         _ = winAvg[f.split('_')[0]]
                     except KeyError:
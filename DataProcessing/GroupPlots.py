@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+import pandas as pd
+import os
+import hashlib
+import json
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+from scipy.optimize import curve_fit
+from scipy.ndimage import gaussian_filter1d
+#Created By Adithya Shastry
+#Email: ams2590@cumc.columbia.edu
+DEBUG = True
+
+CONDITIONS = ['Sham','Cath','Vertex','Anod']
+TITLES = {'Anod':'Anode','Cath':'Cathode','Vertex':'Visual','Sham':'Sham'}
+
+
+#The curves we fit to the group averages. These live at the module level so
+#   they can be sent to the worker processes by name
+def expFunc(x,y0,K,plateau):
+    return (y0 - plateau) * np.exp(-K * x) + plateau
+
+def normFunc(x,K,plateau):
+    y0 = 0
+    return (y0 - plateau) * np.exp(-K * x) + plateau
+
+def percentFastFunc(x,plateau,k):
+    return plateau * np.log(k*x)
+
+FIT_FUNCTIONS = {'expFunc':expFunc,'normFunc':normFunc,'percentFastFunc':percentFastFunc}
+
+
+def renderLearningCurves(data,outfile,column='GroupAvgLogRT',errCol='GroupSEMLogRT',func='normFunc',addZero=False,nPoints=24,yTop=0.025):
+    '''
+    Draws the group average curves with one panel per condition, the same
+    way plotGroupAverages in Plots.ipynb does
+    Inputs:
+        - data: dictionary with (condition,group) keys and the group average
+            data frames as values
+        - outfile: where to save the figure
+        - column: the column to plot
+        - errCol: the column holding the SEM. If a data frame doesn't have it
+            the SEM is found from its subject columns
+        - func: the name of the function in FIT_FUNCTIONS to fit
+        - addZero: start the x axis at zero
+        - nPoints: the number of runs to plot
+        - yTop: the top of the y axis. If None the largest value is used
+    '''
+    func = FIT_FUNCTIONS[func]
+    #find min and max
+    minimum = min(df[column].min() for df in data.values())
+    maximum = max(df[column].max() for df in data.values())
+    if yTop is None:
+        yTop = maximum
+
+    fig,axes = plt.subplots(1,len(CONDITIONS),sharey=True)
+    fig.set_figheight(10)
+    fig.set_figwidth(22)
+    for i,(c,ax) in enumerate(zip(CONDITIONS,axes)):
+        for (cond,group),df in sorted(data.items()):
+            if cond.lower() != c.lower():
+                continue
+            y = df[column].to_numpy()
+            if errCol in df.columns:
+                yerr = df[errCol].to_numpy()
+            else:
+                subjects = [col for col in df.columns if col.endswith('AveargeRunLogRTs')]
+                yerr = df[subjects].sem(axis=1).to_numpy()
+            if addZero:
+                x = np.arange(0,len(y),1)
+            else:
+                x = np.arange(1,len(y)+1,1)
+
+            #Smooth out the curve and the error
+            y = gaussian_filter1d(y,1)
+            yerr = gaussian_filter1d(yerr,1)
+
+            #Fit the curve and create a trend line
+            popt,pcov = curve_fit(func,x[:nPoints],y[:nPoints],maxfev=10000)
+            trendline = func(x[:nPoints],*popt)
+
+            color = 'blue' if group.lower() == 'control' else 'red'
+            label = group.capitalize()
+            ax.scatter(x[:nPoints],y[:nPoints],label=label,color=color)
+            ax.plot(x[:nPoints],trendline,'--',color=color,label="{} Regression".format(label))
+            ax.fill_between(x[:nPoints],y[:nPoints]-yerr[:nPoints],y[:nPoints]+yerr[:nPoints],alpha=0.1,antialiased=True,facecolor=color)
+
+        ax.set_xticks(np.arange(0,nPoints,4))
+        ax.set_ylim(minimum,yTop)
+        ax.set_xlim(0,nPoints)
+        ax.grid(True)
+        ax.set_title(TITLES.get(c,c),fontdict={'fontsize':22})
+        ax.set_xlabel("Run",fontsize=22)
+        if i == 0:
+            ax.set_ylabel(column,fontsize=22)
+            ax.legend(loc=3,prop={'size':14})
+    fig.subplots_adjust(wspace=0,hspace=0)
+    fig.savefig(outfile)
+    plt.close(fig)
+
+
+def renderCoherence(data,outfile,connection='SMA-Motor',conditions=['Sham','Cathode','Visual','Anode'],groups=['Control','Patient']):
+    '''
+    Draws a bar plot of the mean coherence for one connection with SEM error
+    bars, the same figure as Coherence Plots.ipynb
+    Inputs:
+        - data: the mean and sem data frame from ShortFatConverter.summarise
+        - outfile: where to save the figure
+        - connection: the connection to plot
+        - conditions: the conditions to plot, in order
+        - groups: the groups to plot, in order
+    '''
+    colors = ['black','blue','green','red']
+    width = 0.8/len(groups)
+    fig,ax = plt.subplots()
+    x = np.arange(len(conditions))
+    for i,g in enumerate(groups):
+        rows = data.reindex([(g,cond,connection) for cond in conditions])
+        ax.bar(x + (i - (len(groups)-1)/2)*width,rows['mean'],width,yerr=rows['sem'],
+               label=g,color=colors[i % len(colors)],capsize=3)
+    ax.set_xticks(x)
+    ax.set_xticklabels(conditions)
+    ax.set_xlabel('Condition')
+    ax.set_ylabel('Coherence')
+    ax.legend(loc=1)
+    ax.set_title("Coherence Measures for {}".format(connection))
+    fig.savefig(outfile)
+    plt.close(fig)
+
+RENDERERS = {'learningCurves':renderLearningCurves,'coherence':renderCoherence}
+
+
+def renderFigure(spec):
+    '''
+    Renders one figure spec. This lives at the module level so that it can
+    be sent to the worker processes
+    '''
+    RENDERERS[spec['kind']](spec['data'],spec['outfile'],**spec['style'])
+    return spec['outfile']
+
+
+class GroupPlots:
+    '''
+    This class will render the group figures without a display, in parallel,
+    and skip any figure whose data and style haven't changed since it was
+    last drawn
+    '''
+    def __init__(self,nJobs=None):
+        '''
+        Inputs:
+            - nJobs: the number of worker processes. None uses all of the
+                cores and 1 renders everything in this process
+        '''
+        self.nJobs = nJobs
+        self.specs = []
+
+    def loadGroupAverages(self,directory):
+        '''
+        Reads the group average csv files in a directory once
+        Inputs:
+            - directory: the groupAverageLogRTs or PercentFastGroupAverages
+                directory
+        Returns:
+            - dictionary with (condition,group) keys and data frames as values
+        '''
+        data = dict()
+        for f in sorted(os.listdir(directory)):
+            if not f.endswith('.csv'):
+                continue
+            for c in CONDITIONS:
+                if c.lower() in f.lower():
+                    group = 'CONTROL' if 'control' in f.lower() else 'PATIENT'
+                    data[(c,group)] = pd.read_csv(os.path.join(directory,f),index_col=0)
+        return data
+
+    def addLearningCurves(self,data,outfile,**style):
+        '''
+        Adds a learning curve figure. See renderLearningCurves for the style
+        options
+        '''
+        self.specs.append({'kind':'learningCurves','data':data,'outfile':outfile,'style':style})
+
+    def addCoherence(self,data,outfile,**style):
+        '''
+        Adds a coherence bar plot. See renderCoherence for the style options
+        '''
+        self.specs.append({'kind':'coherence','data':data,'outfile':outfile,'style':style})
+
+    def specHash(self,spec):
+        '''
+        Hashes the data and style of a figure
+        '''
+        digest = hashlib.sha256(spec['kind'].encode())
+        data = spec['data']
+        frames = [data[k] for k in sorted(data)] if isinstance(data,dict) else [data]
+        keys = sorted(data) if isinstance(data,dict) else []
+        digest.update(repr(keys).encode())
+        for df in frames:
+            digest.update(pd.util.hash_pandas_object(df).values.tobytes())
+            digest.update(repr(list(df.columns)).encode())
+        digest.update(repr(sorted(spec['style'].items())).encode())
+        return digest.hexdigest()
+
+    def render(self,force=False):
+        '''
+        Renders every figure that was added whose data or style has changed.
+        The hashes are kept in a .figureHashes.json file next to the figures
+        Inputs:
+            - force: render everything
+        Returns:
+            - the list of figures that were rendered
+        '''
+        manifests = dict()
+        todo = []
+        for spec in self.specs:
+            directory = os.path.dirname(os.path.abspath(spec['outfile']))
+            if directory not in manifests:
+                try:
+                    with open(os.path.join(directory,'.figureHashes.json'),'r') as f:
+                        manifests[directory] = json.load(f)
+                except (OSError,ValueError):
+                    manifests[directory] = dict()
+            name = os.path.basename(spec['outfile'])
+            spec['hash'] = self.specHash(spec)
+            if force or manifests[directory].get(name) != spec['hash'] or not os.path.exists(spec['outfile']):
+                todo.append(spec)
+            elif DEBUG:
+                print("Unchanged:",spec['outfile'])
+
+        if self.nJobs == 1 or len(todo) <= 1:
+            rendered = [renderFigure(spec) for spec in todo]
+        else:
+            with ProcessPoolExecutor(max_workers=self.nJobs) as pool:
+                rendered = list(pool.map(renderFigure,todo))
+
+        for spec in todo:
+            directory = os.path.dirname(os.path.abspath(spec['outfile']))
+            manifests[directory][os.path.basename(spec['outfile'])] = spec['hash']
+        for directory,manifest in manifests.items():
+            with open(os.path.join(directory,'.figureHashes.json'),'w') as f:
+                json.dump(manifest,f,indent=1)
+        if DEBUG:
+            print("Rendered:",rendered)
+        self.specs = []
+        return rendered
+
+
+def renderMockupFigures(dataDir,nJobs=None,force=False):
+    '''
+    Renders the figures used in the motor RT mockup: the normalized learning
+    curves, the percent fast curves and the coherence bar plots
+    Inputs:
+        - dataDir: full filepath to the data directory
+        - nJobs: see GroupPlots
+        - force: render everything even if it hasn't changed
+    Returns:
+        - the list of figures that were rendered
+    '''
+    from DataProcessing.Pipeline import loadShortFatConverter
+    plots = GroupPlots(nJobs=nJobs)
+
+    groupDir = os.path.join(dataDir,'NormalizedData','NormalizedWrangledData','SUBJECT_RUN','subjectRunAvgs','groupAverageLogRTs')
+    plots.addLearningCurves(plots.loadGroupAverages(groupDir),os.path.join(groupDir,'GroupAvgLogRT_plot.png'),
+                            func='normFunc',addZero=True)
+
+    fastDir = os.path.join(groupDir,'PercentFastGroupAverages')
+    plots.addLearningCurves(plots.loadGroupAverages(fastDir),os.path.join(fastDir,'GroupAvgPercentFast_plot.png'),
+                            column='GroupAvgPercentFast',func='percentFastFunc',yTop=None)
+
+    coherenceDir = os.path.join(dataDir,'coherenceData')
+    conv = loadShortFatConverter()()
+    summary = conv.summarise(conv.toLong(os.path.join(coherenceDir,'Coherence results_controls and patients_SHORTFATwithGroupNames.csv')))
+    for conn in ['SMA-Motor','SMA-Visual','Motor-Visual']:
+        plots.addCoherence(summary,os.path.join(coherenceDir,'{}_Coherence_plot.png'.format(conn)),connection=conn)
+
+    return plots.render(force=force)
+
+
+if __name__ == '__main__':
+
+    renderMockupFigures("/Users/adish/Documents/NYPSI Research/TDCS-SRTT/data")
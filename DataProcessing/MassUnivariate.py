@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+import pandas as pd
+import re
+import numpy as np
+from scipy import stats
+#Created By Adithya Shastry
+#Email: ams2590@cumc.columbia.edu
+DEBUG = True
+
+#The columns that were merged onto the combined dataset: the RT averages, the
+#   EEG window averages and the coherence values
+MEASURE_PATTERN = r'^AvgNormLogRT|^AvgRandomLogRT|_e\d$|_Coherence$'
+#The non-sham condition names used in those columns, longest first so that
+#   Anode is matched before Anod
+CONDITION_PATTERN = r'Anode|Cathode|Visual|Anod|Cath|Vertex'
+
+
+def welchT(a,b):
+    '''
+    Runs a Welch t-test on every column at once, ignoring missing values
+    Inputs:
+        - a,b: 2d arrays (subjects x columns) for the two groups
+    Returns:
+        - t values, degrees of freedom and the sample sizes of a and b
+    '''
+    nA = np.sum(~np.isnan(a),axis=0)
+    nB = np.sum(~np.isnan(b),axis=0)
+    with np.errstate(invalid='ignore',divide='ignore'):
+        seA = np.nanvar(a,axis=0,ddof=1)/nA
+        seB = np.nanvar(b,axis=0,ddof=1)/nB
+        t = (np.nanmean(a,axis=0) - np.nanmean(b,axis=0))/np.sqrt(seA + seB)
+        df = (seA + seB)**2/(seA**2/(nA - 1) + seB**2/(nB - 1))
+    return t,df,nA,nB
+
+
+def pairedT(a,b):
+    '''
+    Runs a paired t-test on every column at once, using the subjects that
+    have both values
+    Inputs:
+        - a,b: 2d arrays (subjects x columns) with matching rows
+    Returns:
+        - t values, degrees of freedom and the number of pairs
+    '''
+    diffs = a - b
+    n = np.sum(~np.isnan(diffs),axis=0)
+    with np.errstate(invalid='ignore',divide='ignore'):
+        t = np.nanmean(diffs,axis=0)/np.sqrt(np.nanvar(diffs,axis=0,ddof=1)/n)
+    return t,n - 1,n
+
+
+def correlate(x,y):
+    '''
+    Finds the pearson correlation of every covariate with every column at
+    once, using the subjects that have both values
+    Inputs:
+        - x: 2d array (subjects x covariates)
+        - y: 2d array (subjects x columns)
+    Returns:
+        - 2d arrays (covariates x columns) of r values and sample sizes
+    '''
+    #Broadcast to (subjects x covariates x columns) and mask the pairs with a
+    #   missing value
+    mask = ~np.isnan(x)[:,:,None] & ~np.isnan(y)[:,None,:]
+    x = np.where(mask,x[:,:,None],0)
+    y = np.where(mask,y[:,None,:],0)
+    n = mask.sum(axis=0)
+    with np.errstate(invalid='ignore',divide='ignore'):
+        x = np.where(mask,x - x.sum(axis=0)/n,0)
+        y = np.where(mask,y - y.sum(axis=0)/n,0)
+        r = (x*y).sum(axis=0)/np.sqrt((x**2).sum(axis=0)*(y**2).sum(axis=0))
+    return r,n
+
+
+def fdrCorrect(pValues):
+    '''
+    Benjamini-Hochberg adjusted p values. Missing p values are left missing
+    '''
+    p = np.asarray(pValues,dtype=float)
+    adjusted = np.full(p.shape,np.nan)
+    valid = np.flatnonzero(~np.isnan(p))
+    order = valid[np.argsort(p[valid])]
+    m = len(order)
+    #Step up: take the running minimum from the largest p value down
+    scaled = p[order]*m/np.arange(1,m + 1)
+    adjusted[order] = np.minimum(np.minimum.accumulate(scaled[::-1])[::-1],1)
+    return adjusted
+
+
+def holmCorrect(pValues):
+    '''
+    Holm-Bonferroni adjusted p values. Missing p values are left missing
+    '''
+    p = np.asarray(pValues,dtype=float)
+    adjusted = np.full(p.shape,np.nan)
+    valid = np.flatnonzero(~np.isnan(p))
+    order = valid[np.argsort(p[valid])]
+    m = len(order)
+    #Step down: take the running maximum from the smallest p value up
+    scaled = p[order]*(m - np.arange(m))
+    adjusted[order] = np.minimum(np.maximum.accumulate(scaled),1)
+    return adjusted
+
+
+class MassUnivariate:
+    '''
+    This class will screen every measure of the merged dataset at once for
+    group differences, condition contrasts and correlations with the clinical
+    covariates
+    '''
+    def __init__(self,groupColumn='Cohort',groups=[('Patient',1),('Control',2)],covariates=['Illnessduration','Ageattest','ParticipantSES'],baseline='Sham'):
+        '''
+        Inputs:
+            - groupColumn: the column that holds the group codes
+            - groups: list of two (name,code) tuples. The contrast is the
+                first group minus the second
+            - covariates: the clinical columns to correlate with
+            - baseline: the condition every other condition is contrasted
+                with
+        '''
+        self.groupColumn = groupColumn
+        self.groups = groups
+        self.covariates = covariates
+        self.baseline = baseline
+
+    def measureColumns(self,df):
+        '''
+        Lists the RT, EEG window and coherence columns of the merged dataset
+        '''
+        return [c for c in df.columns if re.search(MEASURE_PATTERN,c)]
+
+    def conditionPairs(self,columns):
+        '''
+        Pairs each condition column with its baseline column, for example
+        Anode_e0 with Sham_e0 and AvgNormLogRTCathBlock1 with
+        AvgNormLogRTShamBlock1
+        Returns:
+            - a list of (column,baselineColumn) tuples
+        '''
+        columns = set(columns)
+        pairs = []
+        for c in sorted(columns):
+            other = re.sub(CONDITION_PATTERN,self.baseline,c,count=1)
+            if other != c and other in columns:
+                pairs.append((c,other))
+        return pairs
+
+    def groupTest(self,df,columns):
+        '''
+        Welch t-tests between the two groups for every column
+        '''
+        (nameA,codeA),(nameB,codeB) = self.groups
+        values = df[columns].to_numpy(dtype=float)
+        group = df[self.groupColumn].to_numpy()
+        t,dof,nA,nB = welchT(values[group == codeA],values[group == codeB])
+        return pd.DataFrame({'Test':'Group','Measure':columns,'Contrast':"{}-{}".format(nameA,nameB),
+                             'Statistic':t,'DF':dof,'N':nA + nB})
+
+    def conditionTest(self,df,pairs):
+        '''
+        Paired t-tests of every condition column against its baseline column
+        '''
+        a = df[[p[0] for p in pairs]].to_numpy(dtype=float)
+        b = df[[p[1] for p in pairs]].to_numpy(dtype=float)
+        t,dof,n = pairedT(a,b)
+        return pd.DataFrame({'Test':'Condition','Measure':[p[0] for p in pairs],
+                             'Contrast':["{}-{}".format(*p) for p in pairs],
+                             'Statistic':t,'DF':dof,'N':n})
+
+    def correlationTest(self,df,columns):
+        '''
+        Pearson correlations of every covariate with every column
+        '''
+        r,n = correlate(df[self.covariates].to_numpy(dtype=float),df[columns].to_numpy(dtype=float))
+        return pd.DataFrame({'Test':'Correlation','Measure':np.tile(columns,len(self.covariates)),
+                             'Contrast':np.repeat(self.covariates,len(columns)),
+                             'Statistic':r.ravel(),'DF':(n - 2).ravel(),'N':n.ravel()})
+
+    def screen(self,df,columns=None):
+        '''
+        Runs every test on every measure and corrects the p values within
+        each kind of test
+        Inputs:
+            - df: the merged dataset
+            - columns: the measures to test. By default all of the RT, EEG
+                window and coherence columns
+        Returns:
+            - a tidy data frame with one row per test and the columns Test,
+                Measure, Contrast, Statistic (t or r), DF, N, pValue, pFDR and
+                pHolm
+        '''
+        if columns is None:
+            columns = self.measureColumns(df)
+        results = pd.concat([self.groupTest(df,columns),
+                             self.conditionTest(df,self.conditionPairs(columns)),
+                             self.correlationTest(df,columns)],ignore_index=True)
+
+        #Turn the statistics into two sided p values
+        stat = results['Statistic'].to_numpy(dtype=float)
+        dof = results['DF'].to_numpy(dtype=float)
+        isR = (results['Test'] == 'Correlation').to_numpy()
+        with np.errstate(invalid='ignore',divide='ignore'):
+            t = np.where(isR,stat*np.sqrt(dof/(1 - stat**2)),stat)
+        results['pValue'] = 2*stats.t.sf(np.abs(t),dof)
+        results['pFDR'] = results.groupby('Test')['pValue'].transform(fdrCorrect)
+        results['pHolm'] = results.groupby('Test')['pValue'].transform(holmCorrect)
+        if DEBUG:
+            print(results.sort_values('pValue').head(20))
+        return results
+
+
+if __name__ == '__main__':
+
+    df = pd.read_csv("/Users/adish/Documents/NYPSI Research/TDCS-SRTT/data/Combined Data/MergedDatawithRTAvgs_WindowAvgs_CoherenceData.csv",index_col=0)
+    mu = MassUnivariate()
+    results = mu.screen(df)
+    results.to_csv("/Users/adish/Documents/NYPSI Research/TDCS-SRTT/data/Combined Data/MassUnivariateResults.csv")
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+import pandas as pd
+import os
+import io
+#Created By Adithya Shastry
+#Email: ams2590@cumc.columbia.edu
+DEBUG = True
+
+
+class MergeDatasets:
+    '''
+    This class will merge the subject level outputs of the different parts
+    of the analysis (RT averages, EEG window averages, coherence) onto the
+    main demographics workbook by PCode
+    '''
+    def __init__(self,mainFile,sources,outputFile,key='PCode'):
+        '''
+        Inputs:
+            - mainFile: full filepath to the excel workbook that everything
+                will be merged onto. It needs a column named key
+            - sources: list of (name,filepath) tuples for the csv files to
+                merge in, in the order they should be joined. The first
+                column of each csv holds the subject code, the same way
+                the files are written by the other classes
+            - outputFile: full filepath of the merged csv to create. A
+                parquet copy is written next to it with the same name. This
+                needs pyarrow, which is optional. Without it only the csv is
+                written
+            - key: the column to join on
+        '''
+        self.mainFile = mainFile
+        self.sources = list(sources)
+        self.outputFile = outputFile
+        self.key = key
+
+    def loadSource(self,file):
+        '''
+        Loads one of the input files indexed by the key
+        Inputs:
+            - file: the full filepath to an excel workbook or csv
+        Returns:
+            - a data frame indexed by the key column
+        '''
+        if file.endswith('.xlsx'):
+            df = pd.read_excel(file)
+        else:
+            df = pd.read_csv(file)
+            #The subject codes are stored in the unnamed first column
+            df = df.rename(columns={df.columns[0]:self.key})
+        df[self.key] = df[self.key].astype(str)
+        return df.set_index(self.key)
+
+    def isStale(self):
+        '''
+        Checks if the merged table needs to be rebuilt
+        Returns:
+            - True if the output is missing or any input is newer than it
+        '''
+        if not os.path.exists(self.outputFile):
+            return True
+        built = os.path.getmtime(self.outputFile)
+        inputs = [self.mainFile] + [path for _,path in self.sources]
+        return any(os.path.getmtime(path) > built for path in inputs)
+
+    def merge(self,force=False):
+        '''
+        Joins all of the sources onto the main workbook. Only the final
+        merged table is written, and only if one of the inputs has changed
+        since it was last built
+        Inputs:
+            - force: rebuild even if nothing has changed
+        Returns:
+            - the merged data frame
+            - a data frame with the keys that were dropped by each join, with
+                the columns Source, PCode and MissingFrom
+        '''
+        if not (force or self.isStale()):
+            if DEBUG:
+                print("{} is up to date".format(self.outputFile))
+            merged = pd.read_csv(self.outputFile,index_col=0)
+            return merged,self.unmatchedKeys()
+
+        main = self.loadSource(self.mainFile)
+        keys = main.index
+        sources = []
+        unmatched = []
+        for name,path in self.sources:
+            source = self.loadSource(path)
+            unmatched.append(self.compareKeys(name,keys,source.index))
+            #An inner join keeps the keys in the order of the main workbook
+            keys = keys.intersection(source.index,sort=False)
+            sources.append(source)
+            if DEBUG:
+                print(name,len(keys))
+        unmatched = pd.concat(unmatched,ignore_index=True)
+        #Now that we know which keys survive we can join everything at once
+        merged = pd.concat([main.loc[keys]] + [source.loc[keys] for source in sources],axis=1)
+
+        #Save the file the same way the notebook used to. The copy packs the
+        #   columns together so adding the key back in is cheap
+        merged = merged.copy().reset_index()
+        merged.to_csv(self.outputFile)
+        try:
+            self.columnar(merged).to_parquet(self.parquetFile())
+        except ImportError:
+            print("pyarrow is not installed, skipping the parquet output")
+        return merged,unmatched
+
+    def parquetFile(self):
+        return "{}.parquet".format(os.path.splitext(self.outputFile)[0])
+
+    def columnar(self,merged):
+        '''
+        Gives every column a single type so it can be saved as parquet. Some
+            of the workbook columns mix dates with error values like #NULL!,
+            these are saved as the same text that is written to the csv
+        '''
+        merged = merged.copy()
+        for c in merged.columns:
+            if merged[c].dtype != object:
+                continue
+            values = merged[c].dropna()
+            if len(set(type(v) for v in values)) > 1:
+                merged[c] = merged[c].map(str).where(merged[c].notna())
+        return merged
+
+    def checkParquet(self):
+        '''
+        Checks that the parquet copy holds the same table as the csv
+        Returns:
+            - True if they match. An AssertionError is raised if they don't
+        '''
+        csv = pd.read_csv(self.outputFile,index_col=0)
+        #Write the parquet table out the same way so both are read back alike
+        parquet = pd.read_csv(io.StringIO(pd.read_parquet(self.parquetFile()).to_csv()),index_col=0)
+        pd.testing.assert_frame_equal(csv,parquet)
+        return True
+
+    def unmatchedKeys(self):
+        '''
+        Finds the keys that would be dropped by each join without building
+        the merged table
+        Returns:
+            - a data frame with the columns Source, PCode and MissingFrom
+        '''
+        keys = self.loadSource(self.mainFile).index
+        unmatched = []
+        for name,path in self.sources:
+            source = self.loadSource(path)
+            unmatched.append(self.compareKeys(name,keys,source.index))
+            keys = keys.intersection(source.index,sort=False)
+        return pd.concat(unmatched,ignore_index=True)
+
+    def compareKeys(self,name,left,right):
+        '''
+        Lists the keys that only exist on one side of a join
+        Inputs:
+            - name: the name of the source being joined
+            - left: the keys merged so far
+            - right: the keys of the source
+        Returns:
+            - a data frame with the columns Source, PCode and MissingFrom
+        '''
+        rows = [{'Source':name,self.key:k,'MissingFrom':name} for k in left.difference(right)]
+        rows += [{'Source':name,self.key:k,'MissingFrom':'merged'} for k in right.difference(left)]
+        unmatched = pd.DataFrame(rows,columns=['Source',self.key,'MissingFrom'])
+        if DEBUG and len(unmatched):
+            print(unmatched)
+        return unmatched
+
+
+if __name__ == '__main__':
+
+    dataDir = "/Users/adish/Documents/NYPSI Research/TDCS-SRTT/data"
+    mainFile = os.path.join(dataDir,"Combined Data","Updated combined tDCS motor schiz dataset-gs, shortened.xlsx")
+    sources = [('RT',os.path.join(dataDir,"SubjectRTAvgs.csv")),
+               ('WindowAvgs',os.path.join(dataDir,"EEG Data","TSE paper2","eegWindowAvgs.csv")),
+               ('Coherence',os.path.join(dataDir,"coherenceData","Coherence results_controls and patients_SHORTFAT.csv"))]
+    outputFile = os.path.join(dataDir,"Combined Data","MergedDatawithRTAvgs_WindowAvgs_CoherenceData.csv")
+
+    md = MergeDatasets(mainFile,sources,outputFile)
+    merged,unmatched = md.merge()
+    print(unmatched)
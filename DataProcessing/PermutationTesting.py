@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+import pandas as pd
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy import ndimage
+from scipy import stats
+from DataProcessing.EEGProcessing import EEGProcessing
+#Created By Adithya Shastry
+#Email: ams2590@cumc.columbia.edu
+DEBUG = True
+
+#Only neighbours within the same time-frequency map are connected, there is
+#   no connectivity across permutations or channels
+CLUSTER_STRUCTURE = np.zeros((3,3,3,3),dtype=bool)
+CLUSTER_STRUCTURE[1,1] = ndimage.generate_binary_structure(2,1)
+
+
+def welchTMaps(data,labels,nA):
+    '''
+    Computes the Welch t map for every row of group labels at once
+    Inputs:
+        - data: 2d array (subjects x pixels) holding both groups
+        - labels: 2d 0/1 array (permutations x subjects), 1 marks group A
+        - nA: the number of subjects in group A
+    Returns:
+        - 2d array (permutations x pixels) of t values
+    '''
+    nB = data.shape[0] - nA
+    #Centre the data first so the sums of squares below stay accurate
+    data = data - data.mean(axis=0)
+    sumAll = data.sum(axis=0)
+    sumSqAll = (data**2).sum(axis=0)
+    sumA = labels @ data
+    sumSqA = labels @ (data**2)
+    meanA = sumA/nA
+    meanB = (sumAll - sumA)/nB
+    varA = (sumSqA - nA*meanA**2)/(nA - 1)
+    varB = (sumSqAll - sumSqA - nB*meanB**2)/(nB - 1)
+    return (meanA - meanB)/np.sqrt(varA/nA + varB/nB)
+
+
+def pairedTMaps(diffs,signs):
+    '''
+    Computes the one sample t map of the paired differences for every row of
+    sign flips at once
+    Inputs:
+        - diffs: 2d array (subjects x pixels) of paired differences
+        - signs: 2d +1/-1 array (permutations x subjects)
+    Returns:
+        - 2d array (permutations x pixels) of t values
+    '''
+    n = diffs.shape[0]
+    #Flipping signs does not change the sum of squares
+    sumSq = (diffs**2).sum(axis=0)
+    mean = (signs @ diffs)/n
+    var = (sumSq - n*mean**2)/(n - 1)
+    return mean/np.sqrt(var/n)
+
+
+def labelClusters(tMaps,threshold):
+    '''
+    Labels the supra-threshold clusters of a stack of t maps in one pass
+    Inputs:
+        - tMaps: 4d array (permutations x channels x dim1 x dim2)
+        - threshold: the cluster forming t threshold, applied to both tails
+    Returns:
+        - a list with one (labels,masses) tuple per tail where labels has the
+            same shape as tMaps and masses[i] is the summed |t| of cluster i+1
+    '''
+    output = []
+    for tail in [tMaps > threshold,tMaps < -threshold]:
+        labels,nClusters = ndimage.label(tail,structure=CLUSTER_STRUCTURE)
+        masses = np.bincount(labels.ravel(),weights=np.abs(tMaps).ravel(),minlength=nClusters+1)[1:]
+        output.append((labels,masses))
+    return output
+
+
+def maxClusterMass(tMaps,threshold):
+    '''
+    Finds the largest cluster mass (either tail) of each permutation
+    Inputs:
+        - tMaps: 4d array (permutations x channels x dim1 x dim2)
+        - threshold: the cluster forming t threshold
+    Returns:
+        - 1d array with the maximum cluster mass for each permutation
+    '''
+    maxMass = np.zeros(tMaps.shape[0])
+    permIndex = np.broadcast_to(np.arange(tMaps.shape[0])[:,None,None,None],tMaps.shape)
+    for labels,masses in labelClusters(tMaps,threshold):
+        if len(masses) == 0:
+            continue
+        #Every voxel of a cluster belongs to the same permutation
+        clusterPerm = np.zeros(len(masses)+1,dtype=int)
+        clusterPerm[labels.ravel()] = permIndex.ravel()
+        np.maximum.at(maxMass,clusterPerm[1:],masses)
+    return maxMass
+
+
+def nullChunk(data,nA,nPermutations,seed,threshold,mapShape,paired):
+    '''
+    Builds part of the permutation null distribution. This lives at the module
+    level so that it can be sent to the worker processes
+    Inputs:
+        - data: 2d array (subjects x pixels), the paired differences if paired
+        - nA: the size of group A (ignored if paired)
+        - nPermutations: the number of permutations in this chunk
+        - seed: the SeedSequence for this chunk
+        - threshold: the cluster forming t threshold
+        - mapShape: the (channels,dim1,dim2) shape of a single map
+        - paired: whether to use sign flips instead of label shuffles
+    Returns:
+        - 1d array with the maximum cluster mass of each permutation
+    '''
+    rng = np.random.default_rng(seed)
+    n = data.shape[0]
+    if paired:
+        signs = rng.choice([-1.0,1.0],size=(nPermutations,n))
+        tMaps = pairedTMaps(data,signs)
+    else:
+        labels = np.zeros((nPermutations,n))
+        labels[:,:nA] = 1
+        labels = rng.permuted(labels,axis=1)
+        tMaps = welchTMaps(data,labels,nA)
+    return maxClusterMass(tMaps.reshape((nPermutations,)+mapShape),threshold)
+
+
+class PermutationTesting:
+    '''
+    This class will run cluster based permutation tests over the full
+    time-frequency maps given in the tfc files
+    '''
+    def __init__(self,nPermutations=1000,seed=None,clusterAlpha=0.05,nJobs=None,chunkSize=250,dim1Values=(50,4,-2),dim2Values=(-400,200,25)):
+        '''
+        Inputs:
+            - nPermutations: the number of permutations used for the null
+                distribution
+            - seed: seed for the random number generator so results can be
+                reproduced. The same seed gives the same result regardless
+                of nJobs
+            - clusterAlpha: the two sided p value used to pick the cluster
+                forming t threshold
+            - nJobs: the number of worker processes. None uses all of the
+                cores and 1 runs everything in this process
+            - chunkSize: the number of permutations computed per batch
+            - dim1Values: tuple of the form (start,stop,step) for the range
+                that defines dimension 1 (see EEGProcessing.findWindowAvg)
+            - dim2Values: tuple of the form (start,stop,step) for the range
+                that defines dimension 2
+        '''
+        self.nPermutations = nPermutations
+        self.seed = seed
+        self.clusterAlpha = clusterAlpha
+        self.nJobs = nJobs
+        self.chunkSize = chunkSize
+        self.dim1Range = np.arange(dim1Values[0],dim1Values[1]+dim1Values[2],dim1Values[2])
+        self.dim2Range = np.arange(dim2Values[0],dim2Values[1]+dim2Values[2],dim2Values[2])
+        self.eeg = EEGProcessing()
+
+    def loadConditionMaps(self,directories,cond):
+        '''
+        Loads the maps for one condition from directories of tfc files
+        Inputs:
+            - directories: the directories of tfc files to consider
+            - cond: the condition to load (ex. 'Anode'), matched against the
+                file names the same way as EEGProcessing.findWindowAvg
+        Returns:
+            - a dictionary with the subject codes as keys and 3d arrays
+                (channels x dim1 x dim2) as values
+        '''
+        maps = dict()
+        for path in directories:
+            for f in sorted(os.listdir(path)):
+                if not f.endswith('.tfc'):
+                    continue
+                if not (cond.lower() in f.lower()):
+                    continue
+                tfc = self.eeg.loadtfc(os.path.join(path,f))
+                maps[f.split('_')[0]] = np.stack([arr.astype(float) for arr in tfc.values()])
+        return maps
+
+    def groupTest(self,mapsA,mapsB):
+        '''
+        Tests for differences between two groups of subjects (ex. patients vs
+        controls) by shuffling the group labels
+        Inputs:
+            - mapsA,mapsB: dictionaries of subject maps from loadConditionMaps
+        Returns:
+            - see permutationTest
+        '''
+        data = np.stack(list(mapsA.values()) + list(mapsB.values()))
+        return self.permutationTest(data,nA=len(mapsA))
+
+    def conditionTest(self,mapsActive,mapsSham):
+        '''
+        Tests for differences between two conditions within subjects (ex.
+        active vs sham) by randomly flipping the sign of each subject's
+        difference map. Only subjects with both conditions are used
+        Inputs:
+            - mapsActive,mapsSham: dictionaries of subject maps from
+                loadConditionMaps
+        Returns:
+            - see permutationTest
+        '''
+        subjects = [sub for sub in mapsActive if sub in mapsSham]
+        if DEBUG:
+            print("Paired subjects:",len(subjects))
+        data = np.stack([mapsActive[sub] - mapsSham[sub] for sub in subjects])
+        return self.permutationTest(data,paired=True)
+
+    def permutationTest(self,data,nA=None,paired=False):
+        '''
+        Runs the cluster based permutation test
+        Inputs:
+            - data: 4d array (subjects x channels x dim1 x dim2). For group
+                tests the first nA subjects belong to group A, for paired
+                tests these are the difference maps
+            - nA: the size of group A
+            - paired: whether this is a paired test
+        Returns:
+            - a dictionary with:
+                - tMap: the observed t map (channels x dim1 x dim2)
+                - clusters: a data frame with one row per observed cluster
+                - clusterLabels: positive and negative label maps
+                - nullDistribution: the maximum cluster mass of every
+                    permutation
+        '''
+        mapShape = data.shape[1:]
+        flat = data.reshape((data.shape[0],-1))
+        n = flat.shape[0]
+        if paired:
+            dof = n - 1
+            observed = pairedTMaps(flat,np.ones((1,n)))
+        else:
+            dof = n - 2
+            labels = np.zeros((1,n))
+            labels[:,:nA] = 1
+            observed = welchTMaps(flat,labels,nA)
+        threshold = stats.t.ppf(1 - self.clusterAlpha/2,dof)
+        observed = observed.reshape((1,)+mapShape)
+
+        nullDistribution = self.nullDistribution(flat,nA,threshold,mapShape,paired)
+
+        #Describe the observed clusters
+        rows = []
+        clusterLabels = []
+        for sign,(labels,masses) in zip(['positive','negative'],labelClusters(observed,threshold)):
+            labels = labels[0]
+            clusterLabels.append(labels)
+            for i,mass in enumerate(masses):
+                channel,dim1,dim2 = np.where(labels == i+1)
+                pValue = (np.sum(nullDistribution >= mass) + 1)/(len(nullDistribution) + 1)
+                rows.append({'Sign':sign,
+                             'Channel':channel[0],
+                             'Label':i+1,
+                             'Size':len(dim1),
+                             'Mass':mass,
+                             'Dim1Min':self.dim1Range[dim1].min(),
+                             'Dim1Max':self.dim1Range[dim1].max(),
+                             'Dim2Min':self.dim2Range[dim2].min(),
+                             'Dim2Max':self.dim2Range[dim2].max(),
+                             'pValue':pValue})
+        clusters = pd.DataFrame(rows,columns=['Sign','Channel','Label','Size','Mass','Dim1Min','Dim1Max','Dim2Min','Dim2Max','pValue'])
+        if DEBUG:
+            print("Threshold:",threshold)
+            print(clusters)
+        return {'tMap':observed[0],
+                'clusters':clusters,
+                'clusterLabels':clusterLabels,
+                'nullDistribution':nullDistribution}
+
+    def nullDistribution(self,data,nA,threshold,mapShape,paired):
+        '''
+        Builds the null distribution of the maximum cluster mass. The
+        permutations are split into chunks which each get their own child
+        seed, so the result only depends on the seed and chunkSize
+        Inputs:
+            - see nullChunk
+        Returns:
+            - 1d array with the maximum cluster mass of every permutation
+        '''
+        chunks = [self.chunkSize]*(self.nPermutations//self.chunkSize)
+        if self.nPermutations % self.chunkSize:
+            chunks.append(self.nPermutations % self.chunkSize)
+        seeds = np.random.SeedSequence(self.seed).spawn(len(chunks))
+        args = [(data,nA,size,s,threshold,mapShape,paired) for size,s in zip(chunks,seeds)]
+        if self.nJobs == 1:
+            results = [nullChunk(*a) for a in args]
+        else:
+            with ProcessPoolExecutor(max_workers=self.nJobs) as pool:
+                results = list(pool.map(nullChunk,*zip(*args)))
+        return np.concatenate(results)
+
+
+if __name__ == '__main__':
+
+    controlDir = "/Users/adish/Documents/NYPSI Research/TDCS-SRTT/data/EEG Data/TSE paper2/Controls Source TSE"
+    patientDir = "/Users/adish/Documents/NYPSI Research/TDCS-SRTT/data/EEG Data/TSE paper2/Patients Source TSE"
+    controlDirs = [os.path.join(controlDir,d) for d in os.listdir(controlDir) if os.path.isdir(os.path.join(controlDir,d))]
+    patientDirs = [os.path.join(patientDir,d) for d in os.listdir(patientDir) if os.path.isdir(os.path.join(patientDir,d))]
+
+    pt = PermutationTesting(nPermutations=5000,seed=0)
+
+    #Patients vs controls for each condition
+    for cond in ['Anode','Cathode','Sham','Visual']:
+        print(cond)
+        controls = pt.loadConditionMaps(controlDirs,cond)
+        patients = pt.loadConditionMaps(patientDirs,cond)
+        result = pt.groupTest(patients,controls)
+
+    #Active vs sham within subjects
+    sham = pt.loadConditionMaps(controlDirs+patientDirs,'Sham')
+    for cond in ['Anode','Cathode','Visual']:
+        print(cond,"vs Sham")
+        active = pt.loadConditionMaps(controlDirs+patientDirs,cond)
+        result = pt.conditionTest(active,sham)
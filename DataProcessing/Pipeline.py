@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import filecmp
+import sys
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from DataProcessing.ResultCache import ResultCache
+#Created By Adithya Shastry
+#Email: ams2590@cumc.columbia.edu
+DEBUG = True
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COHERENCE_DIR = os.path.join(REPO_DIR,'data','coherenceData')
+
+
+def loadShortFatConverter():
+    '''
+    Loads the ShortFatConverter class, which lives next to the coherence
+    data rather than in a package. Its folder is added to the path so the
+    module is imported once under its own name, and the class can be pickled
+    for convertBatch's worker processes
+    '''
+    if COHERENCE_DIR not in sys.path:
+        sys.path.append(COHERENCE_DIR)
+    return importlib.import_module('ShortFatConverter').ShortFatConverter
+
+
+class Pipeline:
+    '''
+    This class will run every stage of the analysis, from the raw excel files
+    to the merged dataset, through a ResultCache so that stages whose inputs
+    and parameters haven't changed are skipped
+    '''
+    def __init__(self,dataDir,cacheDir=None,maxCacheBytes=2**30,fastCutOff=-0.275,window=(18,12,-100,0),dim1Values=(50,4,-2),dim2Values=(-400,200,25),normalization=None,createCache=True):
+        '''
+        Inputs:
+            - dataDir: full filepath to the data directory. The layout
+                inside of it is the same as in the repository
+            - cacheDir: where to keep the cache. By default this is a
+                .pipelineCache folder inside dataDir
+            - maxCacheBytes: the size limit of the cache
+            - fastCutOff: see ExponentialGraphs.percentFast
+            - window,dim1Values,dim2Values: see EEGProcessing.findWindowAvg
+            - normalization: an RTNormalization. If given, the
+                NormalizedData excel file is created from the raw data
+                before the normalized stages run. It has to be the only
+                excel file in NormalizedData, runRT raises an AssertionError
+                otherwise. If None the NormalizedData that is already there
+                is used
+            - createCache: make the cache directory if it doesn't exist. Use
+                False to look at the layout and cache without writing to
+                the data directory
+        '''
+        self.dataDir = dataDir
+        if cacheDir is None:
+            cacheDir = os.path.join(dataDir,'.pipelineCache')
+        self.cache = ResultCache(cacheDir,maxBytes=maxCacheBytes,create=createCache)
+        self.fastCutOff = fastCutOff
+        self.window = window
+        self.dim1Values = dim1Values
+        self.dim2Values = dim2Values
+        self.normalization = normalization
+
+        #Lay out where everything is kept
+        self.normData = os.path.join(dataDir,'NormalizedData')
+        self.trialDir = os.path.join(dataDir,'WrangledData','SUBJECT_RUN')
+        self.normTrialDir = os.path.join(self.normData,'NormalizedWrangledData','SUBJECT_RUN')
+        self.subjectDir = os.path.join(self.trialDir,'subjectRunAvgs')
+        self.normSubjectDir = os.path.join(self.normTrialDir,'subjectRunAvgs')
+        self.eegDir = os.path.join(dataDir,'EEG Data','TSE paper2')
+        self.coherenceDir = os.path.join(dataDir,'coherenceData')
+        self.coherenceFile = os.path.join(self.coherenceDir,'Coherence results_controls and patients.xlsx')
+
+    def stageOutputs(self):
+        '''
+        Lists what each stage writes, in the order the stages run
+        Returns:
+            - a list of (stage,paths) tuples using the same stage names as
+                the cache. The paths are files or directories of csv files
+        '''
+        normGroupDir = os.path.join(self.normSubjectDir,'groupAverageLogRTs')
+        base = os.path.splitext(self.coherenceFile)[0]
+        return [('normalize',[os.path.join(self.normData,'NormalizedData.xlsx')]),
+                ('extractDataPoints',[self.trialDir,self.normTrialDir]),
+                ('averageTrials',[self.subjectDir,self.normSubjectDir]),
+                ('getGroupAvearges',[os.path.join(self.subjectDir,'groupAverageLogRTs'),normGroupDir]),
+                ('percentFast',[os.path.join(normGroupDir,'PercentFastGroupAverages')]),
+                ('combineRTData',[os.path.join(self.dataDir,'SubjectRTAvgs.csv')]),
+                ('findWindowAvg',[os.path.join(self.eegDir,'eegWindowAvgs.csv')]),
+                ('ShortFatConverter.convert',["{}_SHORTFAT.csv".format(base),"{}_SHORTFATwithGroupNames.csv".format(base)]),
+                ('merge',[os.path.join(self.dataDir,'Combined Data','MergedDatawithRTAvgs_WindowAvgs_CoherenceData.csv')])]
+
+    def rawFiles(self,directory):
+        '''
+        Lists the raw excel files in a directory
+        '''
+        return [os.path.join(directory,f) for f in sorted(os.listdir(directory)) if f.endswith('.xlsx')]
+
+    #The stages below wrap the existing classes so that each one can be run
+    #   through the cache on its own. The classes are imported when a stage
+    #   runs, so the layout and cache can be looked at without loading pandas
+    def extractDataPoints(self,fileDir,outputDir,columns):
+        from DataWrangler.DataWrangler import TDCSSRTTDataWrangler
+        dw = TDCSSRTTDataWrangler(fileDir=fileDir)
+        extractedData = dw.extractDataPoints(columns)
+        dw.saveDataFrame(extractedData,outputDir)
+
+    def normalize(self,fileDir,outputDir,baseline,baselineTask,keepTasks,blockGroups):
+        from DataProcessing.RTNormalization import RTNormalization
+        RTNormalization(baseline=baseline,baselineTask=baselineTask,keepTasks=keepTasks,blockGroups=blockGroups).writeNormalizedData(fileDir,outputDir)
+
+    def averageTrials(self,fileDir,trialDir):
+        from DataProcessing.exponentialGraphs import ExponentialGraphs
+        expG = ExponentialGraphs()
+        expG.getUnique(filepath=fileDir)
+        expG.averageTrials(filepath=trialDir)
+
+    def getGroupAverages(self,fileDir,subjectDir):
+        from DataProcessing.exponentialGraphs import ExponentialGraphs
+        expG = ExponentialGraphs()
+        expG.getUnique(filepath=fileDir)
+        expG.getGroupAvearges(filepath=subjectDir)
+
+    def percentFast(self,fileDir,subjectFolder,trialDataFolder,outputFolder,fastCutOff):
+        from DataProcessing.exponentialGraphs import ExponentialGraphs
+        expG = ExponentialGraphs()
+        expG.getUnique(filepath=fileDir)
+        expG.percentFast(subjectFolder=subjectFolder,trialDataFolder=trialDataFolder,outputFolder=outputFolder,fastCutOff=fastCutOff)
+
+    def combineRTData(self,nonNormData,normData,outputDir):
+        from DataProcessing.exponentialGraphs import ExponentialGraphs
+        ExponentialGraphs().combineRTData(nonNormData,normData,outputDir)
+
+    def findWindowAvg(self,outputDir,directories,window,dim1Values,dim2Values):
+        from DataProcessing.EEGProcessing import EEGProcessing
+        EEGProcessing().findWindowAvg(outputDir,directories=directories,window=window,dim1Values=dim1Values,dim2Values=dim2Values)
+
+    def convert(self,file):
+        return loadShortFatConverter()().convertBoth(file)
+
+    def runRT(self):
+        '''
+        Runs the reaction time stages for the raw and normalized data. Only
+        the raw excel files are fingerprinted, every later stage is keyed
+        on the stages before it
+        '''
+        c = self.cache
+        #The keys of each branch, so later stages name the branch they read
+        extractKeys = dict()
+        averageKeys = dict()
+        upstream = {'raw':[],'norm':[]}
+        if self.normalization is not None:
+            n = self.normalization
+            #The normalized stages read every excel file in NormalizedData,
+            #   so another workbook there would add its trials to ours
+            normFile = os.path.join(self.normData,'NormalizedData.xlsx')
+            others = [f for f in self.rawFiles(self.normData) if f != normFile] if os.path.isdir(self.normData) else []
+            assert len(others) == 0,"NormalizedData.xlsx has to be the only excel file in {}, found {}".format(self.normData,others)
+            normKey,_ = c.run('normalize',self.normalize,inputs=self.rawFiles(self.dataDir),
+                              outputs=[os.path.join(self.normData,'NormalizedData.xlsx')],
+                              fileDir=self.dataDir,outputDir=self.normData,baseline=n.baseline,
+                              baselineTask=n.baselineTask,keepTasks=n.keepTasks,blockGroups=n.blockGroups)
+            upstream['norm'] = [normKey]
+        for name,fileDir,trialDir,subjectDir in [('raw',self.dataDir,self.trialDir,self.subjectDir),
+                                                 ('norm',self.normData,self.normTrialDir,self.normSubjectDir)]:
+            raw = self.rawFiles(fileDir)
+            extractKey,_ = c.run('extractDataPoints',self.extractDataPoints,inputs=raw,outputs=[trialDir],upstream=upstream[name],
+                                 fileDir=fileDir,outputDir=trialDir,columns=['SUBJECT','RUN'])
+            averageKey,_ = c.run('averageTrials',self.averageTrials,inputs=raw,outputs=[subjectDir],upstream=[extractKey],
+                                 fileDir=fileDir,trialDir=trialDir)
+            groupDir = os.path.join(subjectDir,'groupAverageLogRTs')
+            c.run('getGroupAvearges',self.getGroupAverages,inputs=raw,outputs=[groupDir],upstream=[averageKey],
+                  fileDir=fileDir,subjectDir=subjectDir)
+            extractKeys[name] = extractKey
+            averageKeys[name] = averageKey
+
+        raw = self.rawFiles(self.normData)
+        groupDir = os.path.join(self.normSubjectDir,'groupAverageLogRTs')
+        #percentFast also adds a Fast column to every trial file, but nothing
+        #   later reads it, so only the run averages and group sheets are kept
+        percentKey,_ = c.run('percentFast',self.percentFast,inputs=raw,upstream=[averageKeys['norm']],
+                             outputs=[self.normSubjectDir,os.path.join(groupDir,'PercentFastGroupAverages')],
+                             fileDir=self.normData,subjectFolder=self.normSubjectDir,trialDataFolder=self.normTrialDir,
+                             outputFolder=groupDir,fastCutOff=self.fastCutOff)
+
+        c.run('combineRTData',self.combineRTData,upstream=[extractKeys['raw'],extractKeys['norm'],percentKey],
+              outputs=[self.subjectDir,self.normSubjectDir,os.path.join(self.dataDir,'SubjectRTAvgs.csv')],
+              nonNormData=self.dataDir,normData=self.normData,outputDir=self.dataDir)
+
+    def eegDirectories(self):
+        '''
+        Lists the condition folders of tfc files for both groups
+        '''
+        dirs = []
+        for group in ['Controls Source TSE','Patients Source TSE']:
+            groupDir = os.path.join(self.eegDir,group)
+            for d in sorted(os.listdir(groupDir)):
+                if os.path.isdir(os.path.join(groupDir,d)):
+                    dirs.append(os.path.join(groupDir,d))
+        return dirs
+
+    def runEEG(self):
+        '''
+        Runs the EEG window average stage
+        '''
+        dirs = self.eegDirectories()
+        self.cache.run('findWindowAvg',self.findWindowAvg,inputs=dirs,
+                       outputs=[os.path.join(self.eegDir,'eegWindowAvgs.csv')],
+                       outputDir=self.eegDir,directories=dirs,window=self.window,
+                       dim1Values=self.dim1Values,dim2Values=self.dim2Values)
+
+    def runCoherence(self):
+        '''
+        Runs the short-fat conversion of the coherence data
+        '''
+        base = os.path.splitext(self.coherenceFile)[0]
+        _,outfiles = self.cache.run('ShortFatConverter.convert',self.convert,inputs=[self.coherenceFile],
+                                    outputs=["{}_SHORTFAT.csv".format(base),"{}_SHORTFATwithGroupNames.csv".format(base)],
+                                    file=self.coherenceFile)
+        return outfiles
+
+    def runMerge(self):
+        '''
+        Merges everything onto the combined dataset. MergeDatasets already
+        skips the merge when none of its inputs have changed
+        '''
+        combinedDir = os.path.join(self.dataDir,'Combined Data')
+        mainFile = os.path.join(combinedDir,'Updated combined tDCS motor schiz dataset-gs, shortened.xlsx')
+        base = os.path.splitext(self.coherenceFile)[0]
+        sources = [('RT',os.path.join(self.dataDir,'SubjectRTAvgs.csv')),
+                   ('WindowAvgs',os.path.join(self.eegDir,'eegWindowAvgs.csv')),
+                   ('Coherence',"{}_SHORTFAT.csv".format(base))]
+        outputFile = os.path.join(combinedDir,'MergedDatawithRTAvgs_WindowAvgs_CoherenceData.csv')
+        from DataProcessing.MergeDatasets import MergeDatasets
+        return MergeDatasets(mainFile,sources,outputFile).merge()
+
+    def run(self,concurrent=False):
+        '''
+        Runs the whole pipeline
+        Inputs:
+            - concurrent: run the RT, EEG and coherence stages at the same
+                time in a thread pool. None of the stages change the working
+                directory, so this is safe
+        '''
+        if concurrent:
+            with ThreadPoolExecutor(max_workers=3) as pool:
+                futures = [pool.submit(f) for f in [self.runRT,self.runEEG,self.runCoherence]]
+                for future in futures:
+                    future.result()
+        else:
+            self.runRT()
+            self.runEEG()
+            self.runCoherence()
+        return self.runMerge()
+
+
+def compareConcurrentRun(dataDir,workDir):
+    '''
+    Checks that running the RT and EEG stages in parallel threads gives the
+    same outputs as running them one after another. Two copies of dataDir
+    are made inside workDir and each gets its own empty cache
+    Inputs:
+        - dataDir: full filepath to the data directory
+        - workDir: a scratch directory for the copies
+    Returns:
+        - a list of the output files that differ between the two runs. It is
+            empty if the runs match
+    '''
+    cwd = os.getcwd()
+    copies = []
+    for name in ['serial','threaded']:
+        copy = os.path.join(workDir,name)
+        if os.path.exists(copy):
+            shutil.rmtree(copy)
+        shutil.copytree(dataDir,copy,ignore=shutil.ignore_patterns('.pipelineCache'))
+        copies.append(copy)
+
+    serial = Pipeline(copies[0])
+    serial.runRT()
+    serial.runEEG()
+
+    threaded = Pipeline(copies[1])
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(threaded.runRT),pool.submit(threaded.runEEG)]
+        for future in futures:
+            future.result()
+    assert os.getcwd() == cwd
+
+    #Compare every csv the two runs produced
+    different = []
+    for root,dirs,files in os.walk(copies[0]):
+        dirs[:] = [d for d in dirs if d != '.pipelineCache']
+        for f in files:
+            if not f.endswith('.csv'):
+                continue
+            path = os.path.join(root,f)
+            other = os.path.join(copies[1],os.path.relpath(path,copies[0]))
+            if not (os.path.exists(other) and filecmp.cmp(path,other,shallow=False)):
+                different.append(os.path.relpath(path,copies[0]))
+    if DEBUG:
+        print("Files that differ:",different)
+    return different
+
+
+if __name__ == '__main__':
+
+    pipeline = Pipeline("/Users/adish/Documents/NYPSI Research/TDCS-SRTT/data")
+    pipeline.run()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+import pandas as pd
+import os
+from DataWrangler.ExcelReader import ExcelReader
+#Created By Adithya Shastry
+#Email: ams2590@cumc.columbia.edu
+DEBUG = True
+
+#The columns of the raw excel files
+RAW_COLUMNS = ['SUBJECT','GROUP','BLOCK','TASK','CONDITION','RUN','TRIAL','LOG_RT']
+#The columns each baseline is averaged over. SUBJECT is one subject in one
+#   condition, PCode is the subject across all of their conditions
+BASELINES = {'block':['SUBJECT','BlockGroup'],'condition':['SUBJECT'],'subject':['PCode']}
+
+
+class RTNormalization:
+    '''
+    This class will create the normalized log RTs from the raw trial table,
+    so that the NormalizedData branch no longer depends on a copy made by
+    hand
+    '''
+    def __init__(self,baseline='block',baselineTask='RANDOM',keepTasks=['FIXED'],blockGroups={'Block1':'Block1_2','Block2':'Block1_2'}):
+        '''
+        Inputs:
+            - baseline: which trials share a baseline
+                - 'block': each subject and condition, with blocks 1 and 2
+                    pooled and block 3 on its own. This matches the
+                    NormalizedData that is checked in
+                - 'condition': each subject and condition
+                - 'subject': each subject across all of their conditions
+            - baselineTask: the task whose mean log RT is the baseline
+            - keepTasks: the tasks that are kept in the normalized data
+            - blockGroups: how blocks are pooled for the 'block' baseline.
+                Blocks that aren't listed are on their own
+        '''
+        assert baseline in BASELINES
+        self.baseline = baseline
+        self.baselineTask = baselineTask
+        self.keepTasks = keepTasks
+        self.blockGroups = blockGroups
+
+    def loadRaw(self,fileDir):
+        '''
+        Reads the raw excel files in a directory into one trial table
+        Inputs:
+            - fileDir: the directory with the raw excel files
+        '''
+        frames = ExcelReader().readDirectory(fileDir,columns=RAW_COLUMNS,dtypes={'LOG_RT':'float64'})
+        return pd.concat(frames,ignore_index=True)
+
+    def normalize(self,df):
+        '''
+        Adds the baseline and Normalized_Log_RT columns to the trial table.
+        Every baseline is found with one grouped transform, so the raw and
+        normalized values always come from the same table
+        Inputs:
+            - df: the trial table with the raw columns
+        Returns:
+            - a copy of df with the Baseline and Normalized_Log_RT columns
+        '''
+        df = df.copy()
+        df['PCode'] = df['SUBJECT'].str.split('_').str[0]
+        df['BlockGroup'] = df['BLOCK'].replace(self.blockGroups)
+        #Only the baseline task counts towards the mean
+        baselineRT = df['LOG_RT'].where(df['TASK'] == self.baselineTask)
+        df['Baseline'] = baselineRT.groupby([df[c] for c in BASELINES[self.baseline]]).transform('mean')
+        df['Normalized_Log_RT'] = df['LOG_RT'] - df['Baseline']
+        if DEBUG:
+            print("Trials without a baseline:",df['Baseline'].isna().sum())
+        return df.drop(columns=['PCode','BlockGroup'])
+
+    def normalizedTrials(self,df):
+        '''
+        Puts a normalized trial table in the same layout as the NormalizedData
+        excel file: the kept tasks only, with Normalized_Log_RT in place of
+        LOG_RT
+        '''
+        columns = RAW_COLUMNS[:-1] + ['Normalized_Log_RT']
+        return df.loc[df['TASK'].isin(self.keepTasks),columns]
+
+    def writeNormalizedData(self,fileDir,outputDir):
+        '''
+        Creates the NormalizedData excel file from the raw excel files
+        Inputs:
+            - fileDir: the directory with the raw excel files
+            - outputDir: the NormalizedData directory
+        Returns:
+            - the normalized trial table, which also has the raw LOG_RT
+        '''
+        df = self.normalize(self.loadRaw(fileDir))
+        os.makedirs(outputDir,exist_ok=True)
+        self.normalizedTrials(df).to_excel(os.path.join(outputDir,'NormalizedData.xlsx'),index=False)
+        return df
+
+
+if __name__ == '__main__':
+
+    norm = RTNormalization()
+    norm.writeNormalizedData("/Users/adish/Documents/NYPSI Research/TDCS-SRTT/data",
+                             "/Users/adish/Documents/NYPSI Research/TDCS-SRTT/data/NormalizedData")
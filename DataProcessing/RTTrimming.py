@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+import numpy as np
+from DataProcessing.TrialFeatures import TrialFeatures
+#Created By Adithya Shastry
+#Email: ams2590@cumc.columbia.edu
+DEBUG = True
+
+#Scales the median absolute deviation so it estimates the standard deviation
+MAD_SCALE = 1.4826
+
+
+class RTTrimming:
+    '''
+    This class will mark anticipatory and lapsed responses in the trial table
+    and recompute the run and group averages without them. The trial files
+    are never rewritten, so a new rule only needs the averages recomputed
+    from the table that is already in memory
+    '''
+    def __init__(self,column=None,lower=None,upper=None,rule=None,threshold=2.5,groupBy=['SUBJECT','RUN'],iterative=False,maxIterations=20):
+        '''
+        Inputs:
+            - column: the RT column to trim. If None LOG_RT is used, or
+                Normalized_Log_RT for the normalized data
+            - lower,upper: absolute cutoffs. Trials outside of them are
+                excluded before the rule is applied
+            - rule: None, 'sd' or 'mad'. Trials more than threshold standard
+                deviations (or scaled median absolute deviations) from the
+                mean (or median) of their group are excluded
+            - threshold: see rule
+            - groupBy: the columns that define a group for the rule
+            - iterative: keep applying the rule to the remaining trials
+                until nothing else is excluded
+            - maxIterations: the most times the rule is applied
+        '''
+        assert rule in [None,'sd','mad']
+        self.column = column
+        self.lower = lower
+        self.upper = upper
+        self.rule = rule
+        self.threshold = threshold
+        self.groupBy = groupBy
+        self.iterative = iterative
+        self.maxIterations = maxIterations
+
+    def rtColumn(self,df):
+        '''
+        Finds the RT column the same way averageTrials does
+        '''
+        if self.column is not None:
+            return self.column
+        return 'LOG_RT' if 'LOG_RT' in df.columns else 'Normalized_Log_RT'
+
+    def exclusionMask(self,df):
+        '''
+        Finds the trials to exclude
+        Inputs:
+            - df: the concatenated trial table
+        Returns:
+            - a boolean series aligned with df that is True for excluded
+                trials. Trials with a missing RT are always excluded
+        '''
+        x = df[self.rtColumn(df)].astype(float)
+        excluded = x.isna()
+        if self.lower is not None:
+            excluded |= x < self.lower
+        if self.upper is not None:
+            excluded |= x > self.upper
+        if self.rule is None:
+            return excluded
+
+        keys = [df[c] for c in self.groupBy]
+        for i in range(self.maxIterations if self.iterative else 1):
+            kept = x.where(~excluded)
+            grouped = kept.groupby(keys)
+            if self.rule == 'sd':
+                center = grouped.transform('mean')
+                spread = grouped.transform('std')
+            else:
+                center = grouped.transform('median')
+                spread = (kept - center).abs().groupby(keys).transform('median')*MAD_SCALE
+            #Groups with one trial have no spread, so nothing is excluded
+            new = ~excluded & ((x - center).abs() > self.threshold*spread)
+            if DEBUG:
+                print("Pass {}: {} trials excluded".format(i + 1,new.sum()))
+            if not new.any():
+                break
+            excluded |= new
+        return excluded
+
+    def exclusionCounts(self,df,mask):
+        '''
+        Counts the excluded trials for every subject
+        Returns:
+            - a data frame indexed by SUBJECT with the columns Trials,
+                Excluded and PercentExcluded
+        '''
+        counts = mask.groupby(df['SUBJECT']).agg(['size','sum'])
+        counts.columns = ['Trials','Excluded']
+        counts['PercentExcluded'] = 100*counts['Excluded']/counts['Trials']
+        return counts
+
+    def runAverages(self,df,mask,fastCutOff=None):
+        '''
+        Averages the kept trials of every run, like averageTrials does for
+        the trial files
+        Inputs:
+            - df: the concatenated trial table
+            - mask: the exclusion mask from exclusionMask
+            - fastCutOff: if given, the percent of kept trials at or below it
+                is added the same way percentFast does
+        Returns:
+            - a data frame with the columns SUBJECT, RUN, AverageLogRT and
+                PercentFast (if fastCutOff is given), in run order
+        '''
+        rt = df[self.rtColumn(df)].astype(float).where(~mask)
+        keys = [df['SUBJECT'],df['RUN']]
+        output = rt.groupby(keys).mean().rename('AverageLogRT').to_frame()
+        if fastCutOff is not None:
+            fast = (rt <= fastCutOff).where(rt.notna())
+            output['PercentFast'] = 100*fast.groupby(keys).mean()
+        output = output.reset_index()
+        output['RunNumber'] = output['RUN'].str[3:].astype(int)
+        output = output.sort_values(['SUBJECT','RunNumber']).drop(columns='RunNumber')
+        return output.reset_index(drop=True)
+
+    def groupAverages(self,runAverages):
+        '''
+        Averages the subjects of every condition and group across each run,
+        like getGroupAvearges does
+        Returns:
+            - a data frame indexed by Condition, Group and RUN with the
+                columns GroupAvgLogRT, GroupSEMLogRT and, if the run averages
+                have percent fast, GroupAvgPercentFast and GroupSEMPercentFast.
+                The runs of each condition and group are in run order
+        '''
+        parts = runAverages['SUBJECT'].str.split('_')
+        runAverages = runAverages.assign(Condition=parts.str[1],Group=parts.str[2],RunNumber=runAverages['RUN'].str[3:].astype(int))
+        values = [c for c in ['AverageLogRT','PercentFast'] if c in runAverages.columns]
+        #Group on the run number so the runs are in order rather than sorted
+        #   as text (Run1, Run10, Run11...)
+        output = runAverages.groupby(['Condition','Group','RunNumber','RUN'])[values].agg(['mean','sem'])
+        output = output.droplevel('RunNumber')
+        #Use the same names as the group average files
+        names = {'mean':'GroupAvg','sem':'GroupSEM'}
+        output.columns = [names[stat] + c.replace('Average','') for c,stat in output.columns]
+        return output
+
+    def trim(self,df,fastCutOff=None):
+        '''
+        Applies the rule and recomputes everything that depends on it
+        Inputs:
+            - df: the concatenated trial table, loaded once with
+                TrialFeatures.loadTrials
+            - fastCutOff: see runAverages
+        Returns:
+            - a dictionary with the mask, the per subject counts, the run
+                averages and the group averages
+        '''
+        mask = self.exclusionMask(df)
+        runAverages = self.runAverages(df,mask,fastCutOff=fastCutOff)
+        return {'mask':mask,'counts':self.exclusionCounts(df,mask),
+                'runAverages':runAverages,'groupAverages':self.groupAverages(runAverages)}
+
+
+if __name__ == '__main__':
+
+    trials = TrialFeatures().loadTrials("/Users/adish/Documents/NYPSI Research/TDCS-SRTT/data/WrangledData/SUBJECT_RUN")
+    #Try a few rules on the same table
+    for trimmer in [RTTrimming(lower=np.log10(100),upper=np.log10(2000)),
+                    RTTrimming(rule='sd',threshold=2.5),
+                    RTTrimming(rule='mad',threshold=3,iterative=True)]:
+        results = trimmer.trim(trials)
+        print(results['counts'].sum())
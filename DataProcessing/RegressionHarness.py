@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+import pandas as pd
+import os
+import json
+import time
+import shutil
+import tracemalloc
+import numpy as np
+from DataProcessing.Pipeline import Pipeline
+from DataProcessing.MergeDatasets import MergeDatasets
+#Created By Adithya Shastry
+#Email: ams2590@cumc.columbia.edu
+DEBUG = True
+
+RT_TRIALS = os.path.join('WrangledData','SUBJECT_RUN')
+NORM_TRIALS = os.path.join('NormalizedData','NormalizedWrangledData','SUBJECT_RUN')
+NORM_GROUPS = os.path.join(NORM_TRIALS,'subjectRunAvgs','groupAverageLogRTs')
+COMBINED = 'Combined Data'
+COHERENCE = os.path.join('coherenceData','Coherence results_controls and patients')
+
+#The checked-in outputs of each stage, relative to the data directory.
+#   Directories stand for the csv files directly inside of them
+GOLDEN = {'averageTrials':[os.path.join(RT_TRIALS,'subjectRunAvgs'),os.path.join(NORM_TRIALS,'subjectRunAvgs')],
+          'getGroupAverages':[NORM_GROUPS],
+          'percentFast':[os.path.join(NORM_GROUPS,'PercentFastGroupAverages')],
+          'combineRTData':['SubjectRTAvgs.csv'],
+          'findWindowAvg':[os.path.join('EEG Data','TSE paper2','eegWindowAvgs.csv')],
+          'convert':[COHERENCE + '_SHORTFAT.csv',COHERENCE + '_SHORTFATwithGroupNames.csv'],
+          'merge':[os.path.join(COMBINED,'MergedDatawithRTAvgs.csv'),
+                   os.path.join(COMBINED,'MergedDatawithRTAvgs_WindowAvgs.csv'),
+                   os.path.join(COMBINED,'MergedDatawithRTAvgs_WindowAvgs_CoherenceData.csv')]}
+
+#The checked-in outputs that are older than the checked-in inputs, as
+#   (row,column) cells. Rows are subject codes, the merged tables are matched
+#   on their PCode column. A column of None is a row that was added since
+#   - the normalized run averages of KJA, ZXR and AVB now have a missing run,
+#       so some of their block averages are missing
+#   - SHORTFATwithGroupNames was saved before the numbered subjects were added
+#   - the coherence merge was also saved before two other run average changes
+STALE_RT = [('KJA','AvgNormLogRTVertexBlock2'),('KJA','AvgNormLogRTVertexBlock1_2'),
+            ('ZXR','AvgNormLogRTVertexBlock2'),('ZXR','AvgNormLogRTVertexBlock1_2'),
+            ('ZXR','AvgNormLogRTCathBlock1'),('ZXR','AvgNormLogRTCathBlock1_2'),
+            ('AVB','AvgNormLogRTAnodBlock2'),('AVB','AvgNormLogRTAnodBlock1_2')]
+KNOWN_DIFFERENCES = {'SubjectRTAvgs.csv':STALE_RT,
+                     GOLDEN['convert'][1]:[(row,None) for row in ['5796','5845','5923','5927']],
+                     GOLDEN['merge'][0]:STALE_RT,
+                     GOLDEN['merge'][1]:STALE_RT,
+                     GOLDEN['merge'][2]:STALE_RT + [('JOS','AvgNormLogRTCathBlock1'),('LOW','AvgNormLogRTShamBlock1'),
+                                                    ('ZXR','AvgNormLogRTCathBlock2')]}
+
+
+class RegressionHarness:
+    '''
+    This class will run every stage against a copy of the checked-in data,
+    compare what they write with the checked-in outputs and check their
+    runtime and peak memory against a stored baseline. Runtimes are stored
+    as multiples of a reference workload timed in the same run, so the
+    baseline holds on a faster or slower machine
+    '''
+    def __init__(self,dataDir,workDir,baselineFile=None,rtol=1e-6,atol=1e-9,slowdown=0.25,minSlowdown=5,memoryGrowth=0.25,ignore=None):
+        '''
+        Inputs:
+            - dataDir: full filepath to the checked-in data directory. It is
+                only read from
+            - workDir: a scratch directory the data is copied into
+            - baselineFile: the json file holding the runtime and memory
+                baseline. By default regressionBaseline.json next to this
+                file
+            - rtol,atol: the tolerances for comparing numbers
+            - slowdown: a stage fails if it takes more than this fraction
+                longer than its baseline, relative to the reference timing
+            - minSlowdown: a stage also has to be this many reference timings
+                slower to fail, so short stages don't fail on noise
+            - memoryGrowth: a stage fails if its peak memory is more than
+                this fraction above its baseline
+            - ignore: dictionary of output paths (as in GOLDEN) and lists of
+                what is known to differ and isn't compared: column names,
+                (row,column) cells, or (row,None) for rows that are new. By
+                default KNOWN_DIFFERENCES
+        '''
+        self.dataDir = dataDir
+        self.workDir = workDir
+        self.copyDir = os.path.join(workDir,'data')
+        if baselineFile is None:
+            baselineFile = os.path.join(os.path.dirname(os.path.abspath(__file__)),'regressionBaseline.json')
+        self.baselineFile = baselineFile
+        self.rtol = rtol
+        self.atol = atol
+        self.slowdown = slowdown
+        self.minSlowdown = minSlowdown
+        self.memoryGrowth = memoryGrowth
+        self.ignore = KNOWN_DIFFERENCES if ignore is None else ignore
+
+    def outputFiles(self,directory,path):
+        '''
+        Lists the csv files a GOLDEN entry stands for, relative to directory
+        '''
+        full = os.path.join(directory,path)
+        if os.path.isdir(full):
+            return [os.path.join(path,f) for f in sorted(os.listdir(full)) if f.endswith('.csv')]
+        return [path]
+
+    def writeIndexWorkbook(self,trialDir,outputDir):
+        '''
+        The raw excel files aren't checked in, but the stages only read the
+        SUBJECT, RUN and CONDITION values out of them. This rebuilds those
+        values in their original order from the trial files, which keep the
+        row number of the raw file in the column before SUBJECT
+        Inputs:
+            - trialDir: the SUBJECT_RUN folder of trial files
+            - outputDir: where to write RegressionIndex.xlsx
+        '''
+        rows = []
+        for f in os.listdir(trialDir):
+            if not f.endswith('.csv'):
+                continue
+            df = pd.read_csv(os.path.join(trialDir,f))
+            if len(df) == 0:
+                #extractDataPoints also saves the subject,run pairs that
+                #   have no trials
+                continue
+            row = df.columns[list(df.columns).index('SUBJECT') - 1]
+            rows.append(df[['SUBJECT','GROUP','CONDITION','RUN']].iloc[[0]].assign(Row=df[row].min()))
+        index = pd.concat(rows).sort_values('Row').drop(columns='Row')
+        index.to_excel(os.path.join(outputDir,'RegressionIndex.xlsx'),index=False)
+
+    def setUp(self):
+        '''
+        Copies the data, removes the checked-in outputs from the copy so every
+        one has to be written again, and adds the index workbooks
+        '''
+        if os.path.exists(self.copyDir):
+            shutil.rmtree(self.copyDir)
+        shutil.copytree(self.dataDir,self.copyDir,ignore=shutil.ignore_patterns('.pipelineCache','*.png'))
+        for paths in GOLDEN.values():
+            for path in paths:
+                for f in self.outputFiles(self.copyDir,path):
+                    os.remove(os.path.join(self.copyDir,f))
+        self.writeIndexWorkbook(os.path.join(self.copyDir,RT_TRIALS),self.copyDir)
+        self.writeIndexWorkbook(os.path.join(self.copyDir,NORM_TRIALS),os.path.join(self.copyDir,'NormalizedData'))
+
+    def stages(self):
+        '''
+        The stages in the order the pipeline runs them, as (name,function)
+        tuples
+        '''
+        p = Pipeline(self.copyDir)
+        runs = [(self.copyDir,p.trialDir,p.subjectDir),(p.normData,p.normTrialDir,p.normSubjectDir)]
+
+        def averageTrials():
+            for fileDir,trialDir,_ in runs:
+                p.averageTrials(fileDir,trialDir)
+
+        def getGroupAverages():
+            for fileDir,_,subjectDir in runs:
+                p.getGroupAverages(fileDir,subjectDir)
+
+        def percentFast():
+            p.percentFast(p.normData,p.normSubjectDir,p.normTrialDir,os.path.join(p.normSubjectDir,'groupAverageLogRTs'),p.fastCutOff)
+
+        def combineRTData():
+            p.combineRTData(self.copyDir,p.normData,self.copyDir)
+
+        def findWindowAvg():
+            p.findWindowAvg(p.eegDir,p.eegDirectories(),p.window,p.dim1Values,p.dim2Values)
+
+        def convert():
+            p.convert(p.coherenceFile)
+
+        def merge():
+            #The three merged tables each add one more source
+            combinedDir = os.path.join(self.copyDir,COMBINED)
+            mainFile = os.path.join(combinedDir,'Updated combined tDCS motor schiz dataset-gs, shortened.xlsx')
+            sources = [('RT',os.path.join(self.copyDir,'SubjectRTAvgs.csv')),
+                       ('WindowAvgs',os.path.join(p.eegDir,'eegWindowAvgs.csv')),
+                       ('Coherence',os.path.join(self.copyDir,COHERENCE + '_SHORTFAT.csv'))]
+            for i,path in enumerate(GOLDEN['merge']):
+                MergeDatasets(mainFile,sources[:i + 1],os.path.join(self.copyDir,path)).merge(force=True)
+
+        return [('averageTrials',averageTrials),('getGroupAverages',getGroupAverages),
+                ('percentFast',percentFast),('combineRTData',combineRTData),
+                ('findWindowAvg',findWindowAvg),('convert',convert),('merge',merge)]
+
+    def measure(self,func):
+        '''
+        Runs a function and returns its runtime in seconds and its peak
+        memory in MB
+        '''
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            func()
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return seconds,peak/2**20
+
+    def referenceTiming(self,rows=200000,repeats=3):
+        '''
+        Times a fixed workload like the stages' (writing, reading and
+        grouping a csv) on this machine
+        Inputs:
+            - rows: the number of rows in the table
+            - repeats: how many times to run it, the fastest is used
+        Returns:
+            - the runtime in seconds
+        '''
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({'SUBJECT':rng.integers(0,200,rows).astype(str),'RUN':rng.integers(1,37,rows),
+                           'LOG_RT':rng.normal(2.6,0.1,rows)})
+        path = os.path.join(self.workDir,'reference.csv')
+        times = []
+        for i in range(repeats):
+            start = time.perf_counter()
+            df.to_csv(path)
+            pd.read_csv(path,index_col=0).groupby(['SUBJECT','RUN'])['LOG_RT'].mean()
+            times.append(time.perf_counter() - start)
+        os.remove(path)
+        return min(times)
+
+    def compareFiles(self,path):
+        '''
+        Compares one output of the copy with the checked-in one
+        Inputs:
+            - path: the path relative to the data directory
+        Returns:
+            - a list of the differences found. It is empty if they match
+        '''
+        new = os.path.join(self.copyDir,path)
+        if not os.path.exists(new):
+            return ["{}: was not written".format(path)]
+        golden = pd.read_csv(os.path.join(self.dataDir,path),index_col=0)
+        output = pd.read_csv(new,index_col=0)
+        #The merged tables are numbered rows, match them on the subject code
+        if 'PCode' in golden.columns and 'PCode' in output.columns:
+            golden = golden.set_index(golden['PCode'].astype(str))
+            output = output.set_index(output['PCode'].astype(str))
+        #Leftover index columns depend on how many times a file was saved
+        ignore = self.ignore.get(path,[])
+        skip = [c for c in ignore if not isinstance(c,tuple)]
+        cells = [c for c in ignore if isinstance(c,tuple)]
+        columns = [c for c in golden.columns if not c.startswith('Unnamed') and c not in skip]
+        differences = ["{}: column {} is missing".format(path,c) for c in columns if c not in output.columns]
+        columns = [c for c in columns if c in output.columns]
+        #Rows that are known to be new aren't counted
+        extra = [row for row,c in cells if c is None and row in output.index and row not in golden.index]
+        if len(golden) != len(output) - len(extra):
+            differences.append("{}: {} rows instead of {}".format(path,len(output) - len(extra),len(golden)))
+        #Rows are matched by label unless the index is just row numbers
+        if not pd.api.types.is_integer_dtype(golden.index):
+            if not golden.index.isin(output.index).all():
+                differences.append("{}: rows {} are missing".format(path,list(golden.index[~golden.index.isin(output.index)])))
+            output = output.reindex(golden.index)
+        else:
+            output = output.iloc[:len(golden)]
+            output.index = golden.index[:len(output)]
+            golden = golden.iloc[:len(output)]
+        for c in columns:
+            a = golden[c]
+            b = output[c]
+            if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+                same = np.isclose(a.to_numpy(dtype=float),b.to_numpy(dtype=float),rtol=self.rtol,atol=self.atol,equal_nan=True)
+            else:
+                same = ((a.astype(str) == b.astype(str)) | (a.isna() & b.isna())).to_numpy()
+                if not same.all():
+                    #Dates are written differently depending on where they
+                    #   were read from (ex. 3/13/13 and 2013-03-13)
+                    dates = self.toDates(a),self.toDates(b)
+                    same = same | (dates[0] == dates[1]).to_numpy()
+            same = same | golden.index.isin([row for row,column in cells if column == c])
+            if not same.all():
+                differences.append("{}: column {} differs in rows {}".format(path,c,list(golden.index[~same])))
+        return differences
+
+    def toDates(self,series):
+        '''
+        Reads the values of a column as dates. Values that aren't dates (ex.
+        #NULL!) are missing, so they never compare as equal
+        '''
+        return pd.to_datetime(series.astype(str),format='mixed',errors='coerce')
+
+    def loadBaseline(self,required=True):
+        '''
+        Loads the stored runtimes and memory. A missing baseline is an error
+        unless required is False, so a fresh checkout can't pass the
+        performance checks without one
+        '''
+        if not os.path.exists(self.baselineFile):
+            assert not required,"There is no baseline at {}, run with updateBaseline=True to make one".format(self.baselineFile)
+            return dict()
+        with open(self.baselineFile,'r') as f:
+            return json.load(f)
+
+    def run(self,updateBaseline=False):
+        '''
+        Runs every stage and checks it
+        Inputs:
+            - updateBaseline: store this run's runtimes and memory as the new
+                baseline. Without it a missing baseline is an error
+        Returns:
+            - a data frame with one row per stage and the columns Seconds,
+                Relative (Seconds over the reference timing), PeakMB,
+                BaselineRelative, BaselinePeakMB, Slowdown, MemoryGrowth,
+                Differences and Passed
+        '''
+        baseline = self.loadBaseline(required=not updateBaseline)
+        self.setUp()
+        #Time the reference before and after so a machine that is busy for
+        #   part of the run is less likely to fail
+        reference = self.referenceTiming()
+        rows = []
+        for name,func in self.stages():
+            if DEBUG:
+                print("Running",name)
+            seconds,peak = self.measure(func)
+            rows.append({'Stage':name,'Seconds':seconds,'PeakMB':peak})
+        reference = min(reference,self.referenceTiming())
+        if DEBUG:
+            print("Reference timing: {:.3f} seconds".format(reference))
+
+        for row in rows:
+            name = row['Stage']
+            #Compare at the end since later stages rewrite earlier outputs
+            differences = []
+            for path in GOLDEN[name]:
+                for f in self.outputFiles(self.dataDir,path):
+                    differences += self.compareFiles(f)
+            old = baseline.get(name,{})
+            row['Relative'] = row['Seconds']/reference
+            row['BaselineRelative'] = old.get('Relative',np.nan)
+            row['BaselinePeakMB'] = old.get('PeakMB',np.nan)
+            row['Slowdown'] = row['Relative']/row['BaselineRelative'] - 1
+            row['MemoryGrowth'] = row['PeakMB']/row['BaselinePeakMB'] - 1
+            row['Differences'] = differences
+            #A stage missing from the baseline (or from one saved before
+            #   runtimes were relative) only passes when the baseline is
+            #   being made
+            if 'Relative' in old and 'PeakMB' in old:
+                slower = row['Slowdown'] > self.slowdown and row['Relative'] - row['BaselineRelative'] > self.minSlowdown
+                fastEnough = not slower and row['MemoryGrowth'] <= self.memoryGrowth
+            else:
+                fastEnough = updateBaseline
+            row['Passed'] = len(differences) == 0 and fastEnough
+
+        report = pd.DataFrame(rows).set_index('Stage')
+        if updateBaseline:
+            with open(self.baselineFile,'w') as f:
+                json.dump({name:{'Relative':row['Relative'],'PeakMB':row['PeakMB']} for name,row in report.iterrows()},f,indent=1)
+        if DEBUG:
+            print(report.drop(columns='Differences'))
+            for d in report['Differences'].sum():
+                print(d)
+        return report
+
+    def check(self,updateBaseline=False):
+        '''
+        Runs the harness and raises an AssertionError naming every stage that
+        gave different outputs or was too slow or used too much memory
+        '''
+        report = self.run(updateBaseline=updateBaseline)
+        failed = report[~report['Passed']]
+        assert len(failed) == 0,"Stages failed: {}".format(
+            {name:row['Differences'] or "{:.0%} slower, {:.0%} more memory".format(row['Slowdown'],row['MemoryGrowth'])
+             for name,row in failed.iterrows()})
+        return report
+
+
+if __name__ == '__main__':
+
+    harness = RegressionHarness("/Users/adish/Documents/NYPSI Research/TDCS-SRTT/data","/tmp/TDCS-SRTT-regression")
+    harness.check()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+import os
+import sys
+import hashlib
+import json
+import pickle
+import tempfile
+import threading
+#Created By Adithya Shastry
+#Email: ams2590@cumc.columbia.edu
+DEBUG = True
+
+
+class ResultCache:
+    '''
+    This class will memoise the stages of the analysis on disk. Each result
+    is stored under a hash of the stage name, the contents of its input
+    files and its arguments, so a stage only runs again when one of those
+    has changed
+    '''
+    def __init__(self,cacheDir,maxBytes=2**30,create=True):
+        '''
+        Inputs:
+            - cacheDir: the directory to keep the cached results in
+            - maxBytes: the size the cache is allowed to grow to before the
+                least recently used results are removed
+            - create: make cacheDir if it doesn't exist. Use False to only
+                look at a cache, a missing one is then treated as empty
+        '''
+        self.cacheDir = cacheDir
+        self.maxBytes = maxBytes
+        if create and not os.path.exists(cacheDir):
+            os.makedirs(cacheDir)
+        self.lock = threading.Lock()
+        #Digests of files we have already hashed, keyed by path and checked
+        #   against the size and modification time so unchanged files are
+        #   not read again
+        self.fingerprintFile = os.path.join(cacheDir,'fingerprints.json')
+        try:
+            with open(self.fingerprintFile,'r') as f:
+                self.fingerprints = json.load(f)
+        except (OSError,ValueError):
+            self.fingerprints = dict()
+
+    def fileFingerprint(self,path):
+        '''
+        Finds the digest of a file's contents
+        Inputs:
+            - path: the full filepath of the file
+        Returns:
+            - the hex digest of the file
+        '''
+        stat = os.stat(path)
+        known = self.fingerprints.get(path)
+        if known is not None and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2]
+        digest = hashlib.sha256()
+        with open(path,'rb') as f:
+            for block in iter(lambda: f.read(2**20),b''):
+                digest.update(block)
+        with self.lock:
+            self.fingerprints[path] = [stat.st_size,stat.st_mtime_ns,digest.hexdigest()]
+        return digest.hexdigest()
+
+    def fingerprint(self,source):
+        '''
+        Finds the digest of a stage input
+        Inputs:
+            - source: a filepath, a directory (the files directly inside it
+                are used), a data frame or series
+        Returns:
+            - the hex digest of the input
+        '''
+        digest = hashlib.sha256()
+        #pandas is only loaded when a data frame is passed in, so looking at
+        #   the cache doesn't import it
+        pd = sys.modules.get('pandas')
+        if pd is not None and isinstance(source,(pd.DataFrame,pd.Series)):
+            digest.update(pd.util.hash_pandas_object(source).values.tobytes())
+            if isinstance(source,pd.DataFrame):
+                digest.update(repr(list(source.columns)).encode())
+        elif os.path.isdir(source):
+            for f in sorted(os.listdir(source)):
+                path = os.path.join(source,f)
+                if os.path.isfile(path) and not f.startswith('.'):
+                    digest.update(f.encode())
+                    digest.update(self.fileFingerprint(path).encode())
+        elif os.path.isfile(source):
+            digest.update(self.fileFingerprint(source).encode())
+        else:
+            digest.update(b'missing')
+        return digest.hexdigest()
+
+    def makeKey(self,stage,inputs,arguments,upstream=[]):
+        '''
+        Builds the key for a stage
+        Inputs:
+            - stage: the name of the stage
+            - inputs: list of inputs that can be passed to fingerprint
+            - arguments: dictionary of the other arguments of the stage
+            - upstream: list of the keys of the stages this one reads the
+                outputs of
+        Returns:
+            - the hex digest used as the cache key
+        '''
+        digest = hashlib.sha256(stage.encode())
+        for source in inputs:
+            digest.update(self.fingerprint(source).encode())
+        for key in upstream:
+            digest.update(key.encode())
+        digest.update(repr(sorted(arguments.items())).encode())
+        return digest.hexdigest()
+
+    def run(self,stage,func,inputs=[],outputs=[],upstream=[],**arguments):
+        '''
+        Runs a stage through the cache
+        Inputs:
+            - stage: the name of the stage
+            - func: the function that runs the stage. It is called as
+                func(**arguments)
+            - inputs: the files, directories or data frames the stage reads
+            - outputs: the files or directories the stage writes. Their
+                contents are stored with the result and any that are
+                missing or changed are written back on a cache hit
+            - upstream: the keys of the stages whose outputs this stage reads.
+                Several stages write over files that other stages read, so
+                chaining the keys is more reliable than fingerprinting
+                those files
+            - arguments: the keyword arguments of func
+        Returns:
+            - the cache key of the stage, to pass on as upstream
+            - the return value of func
+        '''
+        key = self.makeKey(stage,inputs,arguments,upstream)
+        entry = self.load(key)
+        if entry is not None:
+            if DEBUG:
+                print("Cache hit:",stage)
+            self.restoreOutputs(entry['outputs'])
+            return key,entry['result']
+
+        if DEBUG:
+            print("Cache miss:",stage)
+        result = func(**arguments)
+        entry = {'stage':stage,'result':result,'outputs':self.snapshotOutputs(outputs)}
+        self.store(key,entry)
+        self.saveFingerprints()
+        self.evict()
+        return key,result
+
+    def snapshotOutputs(self,outputs):
+        '''
+        Reads the files written by a stage
+        Inputs:
+            - outputs: list of files or directories
+        Returns:
+            - a dictionary with the filepaths as keys and their bytes as values
+        '''
+        files = dict()
+        for output in outputs:
+            if os.path.isdir(output):
+                paths = [os.path.join(output,f) for f in sorted(os.listdir(output))]
+            else:
+                paths = [output]
+            for path in paths:
+                if os.path.isfile(path) and not os.path.basename(path).startswith('.'):
+                    with open(path,'rb') as f:
+                        files[path] = f.read()
+        return files
+
+    def restoreOutputs(self,files):
+        '''
+        Writes back any output files that are missing or that differ from
+        the stored copy, ex. when a run with other arguments wrote over them
+        Inputs:
+            - files: a dictionary from snapshotOutputs
+        '''
+        for path,data in files.items():
+            if os.path.isfile(path) and os.path.getsize(path) == len(data):
+                with open(path,'rb') as f:
+                    if f.read() == data:
+                        continue
+            if not os.path.exists(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path,'wb') as f:
+                f.write(data)
+
+    def entryPath(self,key):
+        return os.path.join(self.cacheDir,"{}.pkl".format(key))
+
+    def load(self,key):
+        '''
+        Loads a cache entry and marks it as recently used
+        Inputs:
+            - key: the cache key
+        Returns:
+            - the entry or None if it isn't in the cache
+        '''
+        path = self.entryPath(key)
+        try:
+            with open(path,'rb') as f:
+                entry = pickle.load(f)
+            os.utime(path)
+        except (OSError,EOFError,pickle.UnpicklingError):
+            return None
+        return entry
+
+    def store(self,key,entry):
+        '''
+        Saves a cache entry. The file is written to a temporary name first
+        so other processes never see half of an entry
+        Inputs:
+            - key: the cache key
+            - entry: the entry to save
+        '''
+        fd,tmp = tempfile.mkstemp(dir=self.cacheDir)
+        with os.fdopen(fd,'wb') as f:
+            pickle.dump(entry,f,protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp,self.entryPath(key))
+
+    def saveFingerprints(self):
+        with self.lock:
+            fingerprints = dict(self.fingerprints)
+        fd,tmp = tempfile.mkstemp(dir=self.cacheDir)
+        with os.fdopen(fd,'w') as f:
+            json.dump(fingerprints,f)
+        os.replace(tmp,self.fingerprintFile)
+
+    def entryRows(self):
+        '''
+        Lists the results in the cache without loading pandas
+        Returns:
+            - a list of dictionaries with the Key, Bytes and LastUsed of each
+                entry, most recently used first
+        '''
+        rows = []
+        if not os.path.isdir(self.cacheDir):
+            return rows
+        for f in os.listdir(self.cacheDir):
+            if not f.endswith('.pkl'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cacheDir,f))
+            except FileNotFoundError:
+                #Another thread evicted it while we were looking
+                continue
+            rows.append({'Key':f[:-4],'Bytes':stat.st_size,'LastUsed':stat.st_mtime})
+        return sorted(rows,key=lambda row: row['LastUsed'],reverse=True)
+
+    def entries(self):
+        '''
+        Lists the results in the cache
+        Returns:
+            - a data frame with the Key, Bytes and LastUsed of each entry,
+                most recently used first
+        '''
+        import pandas as pd
+        return pd.DataFrame(self.entryRows(),columns=['Key','Bytes','LastUsed'])
+
+    def evict(self):
+        '''
+        Removes the least recently used results until the cache fits in
+        maxBytes
+        '''
+        total = 0
+        removed = []
+        for row in self.entryRows():
+            total += row['Bytes']
+            if total > self.maxBytes:
+                removed.append(row['Key'])
+        for key in removed:
+            try:
+                os.remove(self.entryPath(key))
+            except FileNotFoundError:
+                continue
+            if DEBUG:
+                print("Evicted",key)
+
+    def clear(self):
+        '''
+        Removes everything from the cache
+        '''
+        if not os.path.isdir(self.cacheDir):
+            return
+        for f in os.listdir(self.cacheDir):
+            os.remove(os.path.join(self.cacheDir,f))
+        self.fingerprints = dict()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+import os
+#Created By Adithya Shastry
+#Email: ams2590@cumc.columbia.edu
+DEBUG = True
+
+#Header fields that should be read in as numbers
+NUMERIC_FIELDS = ['NumberTrials','NumberTimeSamples','TimeStartInMS','IntervalInMS',
+                  'NumberFrequencies','FreqStartInHz','FreqIntervalInHz','NumberChannels']
+#Fields that have to agree between files for them to be processed together
+DIMENSION_FIELDS = ['NumberTimeSamples','TimeStartInMS','IntervalInMS','NumberFrequencies',
+                    'FreqStartInHz','FreqIntervalInHz','NumberChannels','Channels']
+
+
+class TfcCatalogue:
+    '''
+    This class will build an index of the tfc files that are available by
+    reading only their headers, so that the dataset can be checked before
+    any of the maps are loaded
+    '''
+    def __init__(self):
+        pass
+
+    def readHeader(self,file):
+        '''
+        Reads the header of a tfc file without touching the data
+        Inputs:
+            - file: the full filepath of the tfc file
+        Returns:
+            - a dictionary of the header fields plus a 'Channels' entry
+                holding the channel names from the second line
+        '''
+        with open(file,'r') as f:
+            header = f.readline().split()
+            channels = f.readline().split()
+        output = dict()
+        for field in header:
+            key,_,value = field.partition('=')
+            if key in NUMERIC_FIELDS:
+                try:
+                    value = float(value)
+                    if value.is_integer():
+                        value = int(value)
+                except ValueError:
+                    pass
+            output[key] = value
+        output['Channels'] = ' '.join(channels)
+        return output
+
+    def catalogueRows(self,directories,conditions=['Anode','Cathode','Sham','Visual'],groups=['Control','Patient']):
+        '''
+        Reads the headers of the tfc files in directories without loading
+        pandas. The inputs are the same as buildCatalogue
+        Returns:
+            - a list with one dictionary per tfc file. A directory that
+                doesn't exist or has no tfc files fails loudly, since it is
+                most likely a mistyped path
+        '''
+        rows = []
+        for directory in directories:
+            assert os.path.isdir(directory),"{} is not a directory".format(directory)
+            found = len(rows)
+            for root,dirs,files in os.walk(directory):
+                dirs.sort()
+                #Only the scanned directory's name and the folders below it
+                #   are searched for the group, nearest first, so a checkout
+                #   under a folder named ex. patient-data isn't matched
+                relative = os.path.relpath(root,directory)
+                parts = [os.path.basename(os.path.normpath(directory))] + ([] if relative == '.' else relative.split(os.sep))
+                group = None
+                for part in reversed(parts):
+                    group = next((g for g in groups if g.lower() in part.lower()),None)
+                    if group is not None:
+                        break
+                for f in sorted(files):
+                    if not f.endswith('.tfc'):
+                        continue
+                    path = os.path.join(root,f)
+                    row = {'Path':path,'Subject':f.split('_')[0],'Group':group,'Condition':None}
+                    for cond in conditions:
+                        if cond.lower() in f.lower():
+                            row['Condition'] = cond
+                    row.update(self.readHeader(path))
+                    rows.append(row)
+            assert len(rows) > found,"There are no tfc files in {}".format(directory)
+        return rows
+
+    def buildCatalogue(self,directories,conditions=['Anode','Cathode','Sham','Visual'],groups=['Control','Patient']):
+        '''
+        Builds the catalogue for directories of tfc files
+        Inputs:
+            - directories: the directories of tfc files to consider. Every
+                sub directory is also searched
+            - conditions: the condition names to look for in the file names.
+                These are matched the same way as EEGProcessing.findWindowAvg
+            - groups: the group names to look for in the folders the files
+                are in, up to and including the scanned directory
+        Returns:
+            - a data frame with one row per tfc file holding the path, subject
+                code, group, condition and the header fields
+        '''
+        import pandas as pd
+        rows = self.catalogueRows(directories,conditions=conditions,groups=groups)
+        catalogue = pd.DataFrame(rows)
+        if DEBUG:
+            print(catalogue.head())
+        return catalogue
+
+    def checkCatalogue(self,catalogue,conditions=['Anode','Cathode','Sham','Visual']):
+        '''
+        Looks for problems in a catalogue before a long run is started
+        Inputs:
+            - catalogue: a data frame from buildCatalogue
+            - conditions: the conditions every subject should have, the same
+                ones that were passed to buildCatalogue
+        Returns:
+            - a data frame with one row per problem, with the columns Issue,
+                Subject, Condition and Detail. It is empty if nothing was found
+        '''
+        import pandas as pd
+        columns = ['Issue','Subject','Condition','Detail']
+        if len(catalogue) == 0:
+            issues = pd.DataFrame([{'Issue':'Empty','Subject':None,'Condition':None,'Detail':'No tfc files'}],columns=columns)
+            if DEBUG:
+                print(issues)
+            return issues
+        issues = []
+        #Files that don't match the most common dimensions
+        fields = [d for d in DIMENSION_FIELDS if d in catalogue.columns]
+        dims = catalogue[fields].astype(str).agg('|'.join,axis=1)
+        mismatched = catalogue[dims != dims.mode()[0]]
+        for _,row in mismatched.iterrows():
+            detail = ', '.join("{}={}".format(d,row[d]) for d in fields)
+            issues.append({'Issue':'Dimensions','Subject':row['Subject'],'Condition':row['Condition'],'Detail':detail})
+
+        #Files where the group or condition couldn't be worked out
+        for col in ['Group','Condition']:
+            for _,row in catalogue[catalogue[col].isna()].iterrows():
+                issues.append({'Issue':'Unknown {}'.format(col),'Subject':row['Subject'],'Condition':row['Condition'],'Detail':row['Path']})
+
+        #Subjects that are missing a condition or have it more than once. A
+        #   condition that no subject has still counts as missing
+        counts = catalogue.groupby(['Subject','Condition']).size().unstack(fill_value=0)
+        counts = counts.reindex(columns=conditions,fill_value=0).stack()
+        for (sub,cond),count in counts[counts != 1].items():
+            if count == 0:
+                issues.append({'Issue':'Missing','Subject':sub,'Condition':cond,'Detail':''})
+            else:
+                issues.append({'Issue':'Duplicate','Subject':sub,'Condition':cond,'Detail':"{} files".format(count)})
+
+        issues = pd.DataFrame(issues,columns=columns)
+        if DEBUG:
+            print(issues)
+        return issues
+
+
+if __name__ == '__main__':
+
+    catalogue = TfcCatalogue()
+
+    eegDir = "/Users/adish/Documents/NYPSI Research/TDCS-SRTT/data/EEG Data/TSE paper2"
+    df = catalogue.buildCatalogue([eegDir])
+    issues = catalogue.checkCatalogue(df)
+
+    df.to_csv(os.path.join(eegDir,"tfcCatalogue.csv"))
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+import pandas as pd
+import os
+#Created By Adithya Shastry
+#Email: ams2590@cumc.columbia.edu
+DEBUG = True
+
+
+
+class TrialFeatures:
+    '''
+    This class will compute trial level features from the concatenated trial
+    table and return them as one row per subject so they can be merged on
+    PCode
+    '''
+    def __init__(self,window=5,errorColumn='ERROR'):
+        '''
+        Inputs:
+            - window: the number of trials in the rolling median
+            - errorColumn: the column that marks error trials with 1 (or
+                True). Post error slowing is only computed if the trial table
+                has this column
+        '''
+        self.window = window
+        self.errorColumn = errorColumn
+
+    def loadTrials(self,directory):
+        '''
+        Reads all of the SUBJECT_RUN trial files into one table
+        Inputs:
+            - directory: full filepath to the SUBJECT_RUN folder
+        '''
+        frames = []
+        for f in sorted(os.listdir(directory)):
+            if f.endswith('.csv'):
+                frames.append(pd.read_csv(os.path.join(directory,f),index_col=0))
+        return pd.concat(frames,ignore_index=True)
+
+    def prepare(self,df):
+        '''
+        Adds the PCode, Condition, RunNumber and TrialNumber columns and puts
+        the trials in the order they were done
+        '''
+        df = df.copy()
+        parts = df['SUBJECT'].str.split('_')
+        df['PCode'] = parts.str[0]
+        df['Condition'] = parts.str[1]
+        df['RunNumber'] = df['RUN'].str[3:].astype(int)
+        df['TrialNumber'] = df['TRIAL'].str[5:].astype(int)
+        df['LOG_RT'] = df['LOG_RT'].astype(float)
+        df = df.sort_values(['SUBJECT','RunNumber','TrialNumber'],kind='stable')
+        return df.reset_index(drop=True)
+
+    def widen(self,series,name):
+        '''
+        Turns a series indexed by PCode and other levels into a subject x
+        feature data frame with columns like {name}{Condition}{Block}
+        '''
+        wide = series.unstack([l for l in series.index.names if l != 'PCode'])
+        if isinstance(wide.columns,pd.MultiIndex):
+            wide.columns = [name + ''.join(map(str,c)) for c in wide.columns]
+        else:
+            wide.columns = [name + str(c) for c in wide.columns]
+        return wide
+
+    def rollingMedian(self,df):
+        '''
+        The rolling median RT within each run. Returns the mean of the rolling
+        median and its change from the start to the end of the run for every
+        subject and condition
+        '''
+        runs = df.groupby(['SUBJECT','RunNumber'],sort=False)['LOG_RT']
+        median = runs.rolling(self.window,min_periods=1).median().reset_index(level=[0,1],drop=True)
+        byRun = median.groupby([df['PCode'],df['Condition'],df['RunNumber']])
+        drift = byRun.last() - byRun.first()
+        keys = [df['PCode'],df['Condition']]
+        return pd.concat([self.widen(median.groupby(keys).mean(),'RollingMedianRT'),
+                          self.widen(drift.groupby(level=['PCode','Condition']).mean(),'RollingMedianDrift')],axis=1)
+
+    def sequenceLearning(self,df):
+        '''
+        The random minus fixed sequence RT for every subject, condition and
+        block. A larger value means more sequence learning
+        '''
+        means = df.groupby(['PCode','Condition','BLOCK','TASK'])['LOG_RT'].mean().unstack('TASK')
+        return self.widen(means['RANDOM'] - means['FIXED'],'SequenceLearning').dropna(axis=1,how='all')
+
+    def positionEffect(self,df):
+        '''
+        The slope of RT against trial position within a run for every subject
+        and condition, pooling the runs
+        '''
+        runs = df.groupby(['SUBJECT','RunNumber'],sort=False)
+        x = df['TrialNumber'] - runs['TrialNumber'].transform('mean')
+        y = df['LOG_RT'] - runs['LOG_RT'].transform('mean')
+        keys = [df['PCode'],df['Condition']]
+        slope = (x*y).groupby(keys).sum()/(x**2).groupby(keys).sum()
+        return self.widen(slope,'TrialPositionSlope')
+
+    def postErrorSlowing(self,df):
+        '''
+        The mean RT after an error minus the mean RT after a correct trial for
+        every subject and condition
+        '''
+        error = df[self.errorColumn].astype(bool)
+        previous = error.groupby([df['SUBJECT'],df['RunNumber']],sort=False).shift(1)
+        #The first trial of each run has no previous trial
+        valid = previous.notna() & ~error
+        afterError = previous[valid].astype(bool)
+        means = df.loc[valid,'LOG_RT'].groupby([df.loc[valid,'PCode'],df.loc[valid,'Condition'],afterError]).mean().unstack()
+        return self.widen(means[True] - means[False],'PostErrorSlowing')
+
+    def features(self,df):
+        '''
+        Computes every feature
+        Inputs:
+            - df: the concatenated trial table, as returned by loadTrials
+        Returns:
+            - a data frame indexed by PCode with one column per feature
+        '''
+        df = self.prepare(df)
+        frames = [self.rollingMedian(df),self.sequenceLearning(df),self.positionEffect(df)]
+        if self.errorColumn in df.columns:
+            frames.append(self.postErrorSlowing(df))
+        elif DEBUG:
+            print("No {} column, skipping post error slowing".format(self.errorColumn))
+        output = pd.concat(frames,axis=1)
+        output.index.name = None
+        return output
+
+
+if __name__ == '__main__':
+
+    tf = TrialFeatures()
+    trials = tf.loadTrials("/Users/adish/Documents/NYPSI Research/TDCS-SRTT/data/WrangledData/SUBJECT_RUN")
+    features = tf.features(trials)
+    features.to_csv("/Users/adish/Documents/NYPSI Research/TDCS-SRTT/data/TrialFeatures.csv")
@@ -3,6 +3,7 @@ import pandas as pd
 import os
 import itertools 
 import numpy as np
+from DataWrangler.ExcelReader import ExcelReader
 #Created By Adithya Shastry
 #Email: ams2590@cumc.columbia.edu
 DEBUG = True
@@ -23,12 +24,12 @@ class ExponentialGraphs:
                 have been listed in the columns variable
         '''
         self.originalDataFilepath = filepath
-        #change directory to the filepath
-        os.chdir(filepath)
+        #Only read the columns we need out of the excel files
         dataFrames = []
-        for f in os.listdir():
+        reader = ExcelReader()
+        for f in os.listdir(filepath):
             if f.endswith('.xlsx'):
-                dataFrames.append(pd.read_excel(f))
+                dataFrames.append(reader.read(os.path.join(filepath,f),columns=columns))
 
         #Now, we can concatenate a dataframe with all the data
         self.mainDF = pd.concat(dataFrames,axis=0)
@@ -51,8 +52,6 @@ class ExponentialGraphs:
             - csv files that save the average logRT for each run for a subject
         '''
 
-        os.chdir(filepath)
-
         outputDir = os.path.join(filepath,'subjectRunAvgs')
         print(outputDir)
         if not os.path.exists(outputDir):
@@ -95,8 +94,6 @@ class ExponentialGraphs:
             - csv files for each of the groups with their average run LogRTs
         '''
 
-        #change directory into the filepath
-        os.chdir(filepath)
         outputDir = os.path.join(filepath,'groupAverageLogRTs')
         print(outputDir)
         if not os.path.exists(outputDir):
@@ -149,8 +146,6 @@ class ExponentialGraphs:
                 for each subject
         '''
 
-        #load up the trial by trial data
-        os.chdir(trialDataFolder)
         #get the unique subjects and runs
 
         uniqueSubjectRun = self.getUnique(self.originalDataFilepath,columns=['SUBJECT','RUN'])
@@ -188,12 +183,10 @@ class ExponentialGraphs:
         conditions = ['Anod','cath','vertex','sham']
         #create a list to deliniate subject groups
         groups = ['CONTROL','PATIENT']
-      
-        #change directory to the output
-        os.chdir(outputFolder)
+
         #We can make another folder here to put the sheets
         exportDir = os.path.join(outputFolder,'PercentFastGroupAverages')
-        if not (os.path.exists('PercentFastGroupAverages')):
+        if not (os.path.exists(exportDir)):
             os.mkdir(exportDir)
 
         #iterate through each of the conditions and groups 
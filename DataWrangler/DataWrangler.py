@@ -2,6 +2,7 @@
 import pandas as pd
 import os
 import itertools 
+from DataWrangler.ExcelReader import ExcelReader
 #Created By Adithya Shastry
 #Email: ams2590@cumc.columbia.edu
 
@@ -11,15 +12,17 @@ class TDCSSRTTDataWrangler:
     This class will help format and separate data points so that they can be 
     used for further analysis
     '''
-    def __init__(self,fileDir=None):
+    def __init__(self,fileDir=None,columns=None,dtypes=None):
         '''
         Inputs:
             -fileDir: The directory where the excel files with raw data will 
                be held
+            -columns: the columns to read from the excel files. If None all
+                of the columns are read
+            -dtypes: dictionary of column names and dtypes to apply as the
+                files are read
         '''
         self.fileDir = fileDir
-        #Now we can change the directory to this one
-        os.chdir(self.fileDir)
         #Now, we can load up the files as a list of pandas data frames
         self.files = []
         if DEBUG:
@@ -29,8 +32,9 @@ class TDCSSRTTDataWrangler:
                 self.files.append(f)
         #now open them as data frames
         self.dataFrames = []
+        reader = ExcelReader()
         for f in self.files:
-            self.dataFrames.append(pd.read_excel(f))
+            self.dataFrames.append(reader.read(os.path.join(fileDir,f),columns=columns,dtypes=dtypes))
         if DEBUG:
             print(len(self.dataFrames))
             for data in self.dataFrames:
@@ -151,14 +155,12 @@ class TDCSSRTTDataWrangler:
         '''
         combinedDataFrame = pd.DataFrame()
 
-        #change directory into the directory above
-        os.chdir(directory)
-        for f in os.listdir():
+        for f in os.listdir(directory):
             #check if the file is a csv
             if not f.endswith('.csv'):
                 continue
             #Open up the data as a pandas dataframe
-            fileData = pd.read_csv(f)
+            fileData = pd.read_csv(os.path.join(directory,f))
             if DEBUG:
                 print(fileData.head())
             combinedDataFrame[f.split('.')[0]] = fileData[dataColumn]
@@ -180,9 +182,7 @@ class TDCSSRTTDataWrangler:
             -None, just a saved file
         '''
         #First make the output directory if it doesn't exist
-        if not os.path.exists(directory):
-            os.mkdir(directory)
-        os.chdir(directory)
+        os.makedirs(directory,exist_ok=True)
         #Save the files based on if data is a dict or a dataframe
         if type(data) == dict:
             #Then we want to iterate through all of the keys and then
@@ -191,10 +191,10 @@ class TDCSSRTTDataWrangler:
             print(data.keys())
             for key in data.keys():
                 filename = "{}_{}".format(baseFilename,key)
-                data[key].to_csv("{}.csv".format(filename))
+                data[key].to_csv(os.path.join(directory,"{}.csv".format(filename)))
         elif isinstance(data,pd.DataFrame):
             #We just want to save the dataframe with the basefilename
-            data.to_csv("{}.csv".format(baseFilename))
+            data.to_csv(os.path.join(directory,"{}.csv".format(baseFilename)))
 
 
 if __name__ == '__main__':
@@ -207,7 +207,6 @@ if __name__ == '__main__':
     outputDir = os.path.join(fileDir,'WrangledData')
     if not os.path.exists(outputDir):
         os.mkdir(outputDir)
-    os.chdir(outputDir)
 
     
 
@@ -217,31 +216,27 @@ if __name__ == '__main__':
     folder = '_'.join(columns)
     extractedData = DW.extractDataPoints(columns)
     print(type(extractedData))
-    DW.saveDataFrame(extractedData,folder)
-    os.chdir(outputDir)
+    DW.saveDataFrame(extractedData,os.path.join(outputDir,folder))
 
     #Columns 2
     columns = ['GROUP','TASK']
     folder = '_'.join(columns)
     extractedData = DW.extractDataPoints(columns)
     print(type(extractedData))
-    DW.saveDataFrame(extractedData,folder)
-    os.chdir(outputDir)
+    DW.saveDataFrame(extractedData,os.path.join(outputDir,folder))
 
     #Columns 3
     columns = ['SUBJECT','RUN']
     folder = '_'.join(columns)
     extractedData = DW.extractDataPoints(columns)
     print(type(extractedData))
-    DW.saveDataFrame(extractedData,folder)
-    os.chdir(outputDir)   
+    DW.saveDataFrame(extractedData,os.path.join(outputDir,folder))   
 
 
     print("Combining Data!")
     #Now we can go through and create the combined csv files
-    os.chdir(outputDir) 
-    for d in os.listdir():
-        if not os.path.isdir(d):
+    for d in os.listdir(outputDir):
+        if not os.path.isdir(os.path.join(outputDir,d)):
             #Not a directory so continue
             continue
         folder = os.path.join(outputDir,d)
@@ -253,13 +248,11 @@ if __name__ == '__main__':
     columns = ['GROUP','BLOCK','TASK','CONDITION']
     folder = '_'.join(columns)
     extractedData = DW.extractDataPoints(columns,dataColumn=['LOG_RT'])
-    DW.saveDataFrame(extractedData,folder,"{}_LOG_RTs".format(folder))
-    os.chdir(outputDir)
+    DW.saveDataFrame(extractedData,os.path.join(outputDir,folder),"{}_LOG_RTs".format(folder))
 
 
     print("Combining Data!")
     #Now we can go through and create the combined csv files
-    os.chdir("/Users/adish/Documents/NYPSI and NKI Research/TDCS-SRTT/data/WrangledData/SUBJECT_RUN/subjectRunAvgs") 
     folder = "/Users/adish/Documents/NYPSI and NKI Research/TDCS-SRTT/data/WrangledData/SUBJECT_RUN/subjectRunAvgs"
     extractedData = DW.combineData(folder,'AverageLogRT')
     DW.saveDataFrame(extractedData,folder,baseFilename="{}_CombinedData".format("AverageRunRTbySubject&Condition"))
@@ -274,7 +267,6 @@ if __name__ == '__main__':
     outputDir = os.path.join(fileDir,'NormalizedWrangledData')
     if not os.path.exists(outputDir):
         os.mkdir(outputDir)
-    os.chdir(outputDir)
 
     '''
     #Columns 1
@@ -282,16 +274,14 @@ if __name__ == '__main__':
     folder = '_'.join(columns)
     extractedData = DW.extractDataPoints(columns)
     print(type(extractedData))
-    DW.saveDataFrame(extractedData,folder)
-    os.chdir(outputDir)
+    DW.saveDataFrame(extractedData,os.path.join(outputDir,folder))
 
     #Columns 2
     columns = ['GROUP','TASK']
     folder = '_'.join(columns)
     extractedData = DW.extractDataPoints(columns)
     print(type(extractedData))
-    DW.saveDataFrame(extractedData,folder)
-    os.chdir(outputDir)
+    DW.saveDataFrame(extractedData,os.path.join(outputDir,folder))
 
     
     #Columns 3
@@ -299,15 +289,13 @@ if __name__ == '__main__':
     folder = '_'.join(columns)
     extractedData = DW.extractDataPoints(columns)
     print(type(extractedData))
-    DW.saveDataFrame(extractedData,folder)
-    os.chdir(outputDir)   
+    DW.saveDataFrame(extractedData,os.path.join(outputDir,folder))   
 
    
     print("Combining Data!")
     #Now we can go through and create the combined csv files
-    os.chdir(outputDir) 
-    for d in os.listdir():
-        if not os.path.isdir(d):
+    for d in os.listdir(outputDir):
+        if not os.path.isdir(os.path.join(outputDir,d)):
             continue
         folder = os.path.join(outputDir,d)
         extractedData = DW.combineData(folder,'Normalized_Log_RT')
@@ -315,7 +303,6 @@ if __name__ == '__main__':
     '''
     print("Combining Data!")
     #Now we can go through and create the combined csv files
-    os.chdir("/Users/adish/Documents/NYPSI Research/TDCS-SRTT/data/NormalizedData/NormalizedWrangledData/SUBJECT_RUN/subjectRunAvgs/groupAverageLogRTs") 
     folder = "/Users/adish/Documents/NYPSI Research/TDCS-SRTT/data/NormalizedData/NormalizedWrangledData/SUBJECT_RUN/subjectRunAvgs/groupAverageLogRTs"
     extractedData = DW.combineData(folder,'GroupAvgLogRT')
     DW.saveDataFrame(extractedData,folder,baseFilename="{}_CombinedData".format("AverageRunRTbySubject&Condition"))
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+import pandas as pd
+import os
+import numpy as np
+from openpyxl import load_workbook
+#Created By Adithya Shastry
+#Email: ams2590@cumc.columbia.edu
+
+DEBUG = True
+class ExcelReader:
+    '''
+    This class will stream rows out of xlsx files in read only mode, keeping
+    only the columns that are asked for, so a few columns of a large workbook
+    can be read without loading all of it
+    '''
+    def __init__(self,chunkSize=100000):
+        '''
+        Inputs:
+            -chunkSize: the number of rows in each chunk that iterChunks
+                returns
+        '''
+        self.chunkSize = chunkSize
+
+    def iterChunks(self,file,columns=None,dtypes=None,sheet=0):
+        '''
+        Reads an xlsx file a chunk of rows at a time
+        Inputs:
+            -file: the full filepath to the xlsx file
+            -columns: list of the columns to keep. If None all columns are
+                kept
+            -dtypes: dictionary of column names and the dtype to give them as
+                each chunk is built. Columns that aren't listed have their
+                dtype inferred
+            -sheet: the index or name of the sheet to read
+        Returns:
+            - a generator of data frames with at most chunkSize rows each.
+                Blank rows are skipped and error cells (ex. #NULL!) are read
+                as missing, the same way pd.read_excel does
+        '''
+        if dtypes is None:
+            dtypes = dict()
+        wb = load_workbook(file,read_only=True,data_only=True)
+        try:
+            ws = wb.worksheets[sheet] if isinstance(sheet,int) else wb[sheet]
+            rows = ws.iter_rows()
+            header = [cell.value for cell in next(rows,())]
+            if columns is None:
+                columns = [c for c in header if c is not None]
+            #Find where each column is in the row, this will fail loudly if
+            #   a column doesn't exist
+            for c in columns:
+                assert c in header,"{} is not a column of {}".format(c,file)
+            index = [header.index(c) for c in columns]
+
+            values = [[] for _ in columns]
+            emitted = False
+            for row in rows:
+                if all(cell.value is None for cell in row):
+                    continue
+                for i,j in enumerate(index):
+                    #Blank and error cells (data type e) are read as missing
+                    if j < len(row) and row[j].data_type != 'e' and row[j].value is not None:
+                        values[i].append(row[j].value)
+                    else:
+                        values[i].append(np.nan)
+                #With no columns there is nothing to count the rows by
+                if len(columns) > 0 and len(values[0]) >= self.chunkSize:
+                    yield self.makeFrame(columns,values,dtypes)
+                    values = [[] for _ in columns]
+                    emitted = True
+            #Always give back at least one (possibly empty) chunk
+            if not emitted or any(len(v) > 0 for v in values):
+                yield self.makeFrame(columns,values,dtypes)
+        finally:
+            wb.close()
+
+    def makeFrame(self,columns,values,dtypes):
+        '''
+        Builds a data frame out of lists of column values, applying the dtypes
+        as it goes
+        '''
+        df = pd.DataFrame({c:pd.Series(v,dtype=dtypes.get(c)) for c,v in zip(columns,values)},columns=columns)
+        #Like pd.read_excel, numbers that were typed in as text become
+        #   numbers when the column has no dtype of its own
+        for c in columns:
+            if c not in dtypes and (pd.api.types.is_object_dtype(df[c]) or pd.api.types.is_string_dtype(df[c])):
+                try:
+                    df[c] = pd.to_numeric(df[c])
+                except (ValueError,TypeError):
+                    pass
+        return df
+
+    def read(self,file,columns=None,dtypes=None,sheet=0):
+        '''
+        Reads the requested columns of an xlsx file into one data frame. The
+        inputs are the same as iterChunks
+        '''
+        chunks = list(self.iterChunks(file,columns=columns,dtypes=dtypes,sheet=sheet))
+        if DEBUG:
+            print("Read {} rows from {}".format(sum(len(c) for c in chunks),file))
+        if len(chunks) == 1:
+            return chunks[0]
+        df = pd.concat(chunks,ignore_index=True)
+        #concat can lose categorical dtypes when the categories differ
+        return df.astype(dtypes) if dtypes else df
+
+    def readDirectory(self,directory,columns=None,dtypes=None,sheet=0):
+        '''
+        Reads the requested columns of every xlsx file in a directory
+        Returns:
+            - a list of data frames in the order os.listdir gives the files
+        '''
+        frames = []
+        for f in os.listdir(directory):
+            if f.endswith('.xlsx') and not f.startswith('~$'):
+                frames.append(self.read(os.path.join(directory,f),columns=columns,dtypes=dtypes,sheet=sheet))
+        return frames
+
+
+if __name__ == '__main__':
+
+    reader = ExcelReader()
+    fileDir = '/Users/adish/Documents/NYPSI Research/TDCS-SRTT/data'
+    for df in reader.readDirectory(fileDir,columns=['SUBJECT','RUN'],dtypes={'SUBJECT':'category','RUN':'category'}):
+        print(df.head())
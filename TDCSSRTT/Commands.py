@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import argparse
+import subprocess
+from DataProcessing.Pipeline import Pipeline,REPO_DIR
+from DataProcessing.ResultCache import ResultCache
+from DataProcessing.TfcCatalogue import TfcCatalogue
+#Created By Adithya Shastry
+#Email: ams2590@cumc.columbia.edu
+DEBUG = True
+
+#The commands below only read file names, headers and the cache directory,
+#   so none of these should be imported when they run
+HEAVY_MODULES = ['pandas','numpy','scipy','matplotlib','openpyxl']
+#The commands checkImportBudget runs
+BUDGET_COMMANDS = [['catalogue'],['subjects'],['status'],['cache']]
+
+
+def printTable(rows,columns):
+    '''
+    Prints a list of dictionaries as aligned columns
+    '''
+    cells = [[str(c) for c in columns]] + [[str(row.get(c,'')) for c in columns] for row in rows]
+    widths = [max(len(r[i]) for r in cells) for i in range(len(columns))]
+    for r in cells:
+        print('  '.join(value.ljust(w) for value,w in zip(r,widths)).rstrip())
+
+
+def formatTime(seconds):
+    return time.strftime('%Y-%m-%d %H:%M',time.localtime(seconds))
+
+
+def catalogue(dataDir,directories=None):
+    '''
+    Prints the header of every tfc file
+    Inputs:
+        - dataDir: the data directory
+        - directories: the directories to search. By default the EEG
+            directory of the data
+    '''
+    if not directories:
+        directories = [Pipeline(dataDir,createCache=False).eegDir]
+    rows = TfcCatalogue().catalogueRows(directories)
+    printTable(rows,['Subject','Group','Condition','NumberTrials','NumberTimeSamples','NumberFrequencies','NumberChannels'])
+    return rows
+
+
+def subjects(dataDir):
+    '''
+    Prints the subjects that have trial files, using only the file names
+    '''
+    found = dict()
+    for f in sorted(os.listdir(Pipeline(dataDir,createCache=False).trialDir)):
+        parts = f[:-len('.csv')].split('_')
+        #The trial files are named _SUBJECT_Condition_GROUP_RunN.csv
+        if not f.endswith('.csv') or len(parts) != 5:
+            continue
+        _,code,cond,group,_ = parts
+        row = found.setdefault(code,{'PCode':code,'Group':group,'Conditions':set(),'RunFiles':0})
+        row['Conditions'].add(cond)
+        row['RunFiles'] += 1
+    rows = list(found.values())
+    for row in rows:
+        row['Conditions'] = ','.join(sorted(row['Conditions']))
+    printTable(rows,['PCode','Group','Conditions','RunFiles'])
+    return rows
+
+
+def status(dataDir):
+    '''
+    Prints which outputs of each stage exist, when they were last written and
+    how much is in the cache
+    '''
+    p = Pipeline(dataDir,createCache=False)
+    rows = []
+    for stage,paths in p.stageOutputs():
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                files += [os.path.join(path,f) for f in os.listdir(path) if f.endswith('.csv')]
+            elif os.path.exists(path):
+                files.append(path)
+        row = {'Stage':stage,'Files':len(files),'Modified':'missing'}
+        if len(files) > 0:
+            row['Modified'] = formatTime(max(os.path.getmtime(f) for f in files))
+        rows.append(row)
+    printTable(rows,['Stage','Files','Modified'])
+    entries = p.cache.entryRows()
+    print("{} cached results, {:.1f} MB".format(len(entries),sum(e['Bytes'] for e in entries)/2**20))
+    return rows
+
+
+def cache(dataDir,cacheDir=None,clear=False):
+    '''
+    Prints the results in the cache, most recently used first
+    Inputs:
+        - dataDir: the data directory
+        - cacheDir: the cache directory if it isn't the default one
+        - clear: remove everything from the cache first
+    '''
+    c = Pipeline(dataDir,createCache=False).cache if cacheDir is None else ResultCache(cacheDir,create=False)
+    if clear:
+        c.clear()
+    rows = [{'Key':e['Key'][:16],'MB':round(e['Bytes']/2**20,2),'LastUsed':formatTime(e['LastUsed'])} for e in c.entryRows()]
+    printTable(rows,['Key','MB','LastUsed'])
+    return rows
+
+
+def measureImports(argv):
+    '''
+    Runs python with -X importtime in a new process
+    Inputs:
+        - argv: the arguments after python
+    Returns:
+        - a dictionary of every module that was imported and the seconds it
+            took to import, not counting the modules it imported
+    '''
+    result = subprocess.run([sys.executable,'-X','importtime'] + argv,cwd=REPO_DIR,capture_output=True,text=True)
+    assert result.returncode == 0,result.stderr[-2000:]
+    modules = dict()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            modules[fields[2].strip()] = int(fields[0])/1e6
+        except ValueError:
+            #The header line
+            continue
+    return modules
+
+
+def checkImportBudget(budget=0.15,dataDir=None):
+    '''
+    Checks that importing the package and running each of the commands
+    doesn't load any of HEAVY_MODULES and spends less than budget seconds on
+    imports. Modules python imports on its own aren't counted
+    Inputs:
+        - budget: the import time allowed for each command in seconds
+        - dataDir: the data directory the commands are run on
+    Returns:
+        - a list with the import time and heavy modules of each command.
+            An AssertionError is raised if any of them is over the budget
+    '''
+    interpreter = measureImports(['-c','pass'])
+    runs = [('import TDCSSRTT',['-c','import TDCSSRTT'])]
+    for command in BUDGET_COMMANDS:
+        argv = ['-m','TDCSSRTT'] + (['--data',dataDir] if dataDir else []) + command
+        runs.append((' '.join(command),argv))
+    report = []
+    for name,argv in runs:
+        modules = measureImports(argv)
+        heavy = sorted(m for m in modules if m.split('.')[0] in HEAVY_MODULES)
+        seconds = sum(t for m,t in modules.items() if m not in interpreter)
+        report.append({'Command':name,'ImportSeconds':round(seconds,4),'Heavy':','.join(heavy)})
+    if DEBUG:
+        printTable(report,['Command','ImportSeconds','Heavy'])
+    failed = [r for r in report if r['Heavy'] or r['ImportSeconds'] > budget]
+    assert len(failed) == 0,"Commands over the import budget: {}".format(failed)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m TDCSSRTT',description='Quick commands that run without loading pandas')
+    parser.add_argument('--data',default=os.path.join(REPO_DIR,'data'),help='the data directory')
+    commands = parser.add_subparsers(dest='command',required=True)
+    c = commands.add_parser('catalogue',help='list the tfc files and their headers')
+    c.add_argument('directories',nargs='*',help='the directories to search, by default the EEG data')
+    commands.add_parser('subjects',help='list the subjects that have trial files')
+    commands.add_parser('status',help='show which stage outputs exist and the size of the cache')
+    c = commands.add_parser('cache',help='list the cached results')
+    c.add_argument('--cacheDir',help='the cache directory, by default the one in the data directory')
+    c.add_argument('--clear',action='store_true',help='remove everything from the cache')
+    c = commands.add_parser('budget',help='check that the commands start within the import budget')
+    c.add_argument('--seconds',type=float,default=0.15,help='the import time allowed for each command')
+    args = parser.parse_args(argv)
+
+    if args.command == 'catalogue':
+        catalogue(args.data,args.directories)
+    elif args.command == 'subjects':
+        subjects(args.data)
+    elif args.command == 'status':
+        status(args.data)
+    elif args.command == 'cache':
+        cache(args.data,cacheDir=args.cacheDir,clear=args.clear)
+    elif args.command == 'budget':
+        checkImportBudget(budget=args.seconds,dataDir=args.data)
+
+
+if __name__ == '__main__':
+
+    checkImportBudget(dataDir="/Users/adish/Documents/NYPSI Research/TDCS-SRTT/data")
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+import importlib
+#Created By Adithya Shastry
+#Email: ams2590@cumc.columbia.edu
+
+#The classes that can be imported from the package and the modules they live
+#   in. A module is only imported the first time its class is used, so
+#   importing the package (ex. for the commands) doesn't load pandas
+CLASSES = {'TDCSSRTTDataWrangler':'DataWrangler.DataWrangler',
+           'ExcelReader':'DataWrangler.ExcelReader',
+           'ExponentialGraphs':'DataProcessing.exponentialGraphs',
+           'EEGProcessing':'DataProcessing.EEGProcessing',
+           'MergeDatasets':'DataProcessing.MergeDatasets',
+           'Pipeline':'DataProcessing.Pipeline',
+           'ResultCache':'DataProcessing.ResultCache',
+           'TfcCatalogue':'DataProcessing.TfcCatalogue'}
+
+__all__ = list(CLASSES) + ['ShortFatConverter']
+
+
+def __getattr__(name):
+    '''
+    Imports a class the first time it is asked for
+    '''
+    if name == 'ShortFatConverter':
+        #This one lives next to the coherence data rather than in a package
+        from DataProcessing.Pipeline import loadShortFatConverter
+        value = loadShortFatConverter()
+    elif name in CLASSES:
+        value = getattr(importlib.import_module(CLASSES[name]),name)
+    else:
+        raise AttributeError("module {} has no attribute {}".format(__name__,name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
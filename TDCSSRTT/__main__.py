@@ -0,0 +1,7 @@
+#!/usr/bin/env python3
+from TDCSSRTT.Commands import main
+#Created By Adithya Shastry
+#Email: ams2590@cumc.columbia.edu
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
 import pandas as pd
 import os
+import sys
 import itertools 
-from functools import partial
-import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+#This file sits next to the coherence data rather than in a package. When it
+#   is run as a script put the repository on the path to get at the
+#   DataWrangler package, when it is imported the caller already has it
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if __name__ == '__main__' and REPO_DIR not in sys.path:
+    sys.path.insert(0,REPO_DIR)
+from DataWrangler.ExcelReader import ExcelReader
 #Created By Adithya Shastry
 #Email: ams2590@cumc.columbia.edu
 
@@ -24,24 +31,103 @@ class ShortFatConverter:
             -outfile: the full filepath with name of the file we want to 
                 create
         '''
-        df = pd.read_excel(file)#Read the excel file
+        df = self.readLong(file)
+        outputDF = self.toShortFat(df,includeGroup=includeGroup)
+
+        #Now we can save it 
+        outputDF.to_csv(outfile)
+
+    def convertBoth(self,file,outfile=None,groupOutfile=None):
+        '''
+        Creates the outputs with and without the Group column from a single
+        read of the excel file
+        Inputs:
+            -file: the full filepath to the file we want to convert
+            -outfile: where to save the output without groups. By default
+                this is the input name with _SHORTFAT.csv added on
+            -groupOutfile: where to save the output with groups. By default
+                this is the input name with _SHORTFATwithGroupNames.csv
+                added on
+        Returns:
+            - the two filepaths that were written
+        '''
+        base = os.path.splitext(file)[0]
+        if outfile is None:
+            outfile = "{}_SHORTFAT.csv".format(base)
+        if groupOutfile is None:
+            groupOutfile = "{}_SHORTFATwithGroupNames.csv".format(base)
+        df = self.readLong(file)
+        self.toShortFat(df).to_csv(outfile)
+        self.toShortFat(df,includeGroup=True).to_csv(groupOutfile)
+        return outfile,groupOutfile
+
+    def convertBatch(self,files,outputDir=None,nJobs=None):
+        '''
+        Converts many coherence exports (ex. one per site or frequency band)
+        in parallel, creating both outputs for each one
+        Inputs:
+            -files: a directory holding the excel files or a list of
+                filepaths
+            -outputDir: where to put the outputs. By default they are saved
+                next to their input file
+            -nJobs: the number of worker processes. None uses all of the
+                cores and 1 converts the files one after another
+        Returns:
+            - a dictionary with the input files as keys and the pair of
+                output filepaths as values
+        '''
+        if isinstance(files,str):
+            directory = files
+            files = [os.path.join(directory,f) for f in sorted(os.listdir(directory))
+                     if f.endswith('.xlsx') and not f.startswith('~$')]
+        outfiles = []
+        groupOutfiles = []
+        for f in files:
+            base = os.path.splitext(f)[0]
+            if outputDir is not None:
+                base = os.path.join(outputDir,os.path.basename(base))
+            outfiles.append("{}_SHORTFAT.csv".format(base))
+            groupOutfiles.append("{}_SHORTFATwithGroupNames.csv".format(base))
+        if nJobs == 1:
+            results = list(map(self.convertBoth,files,outfiles,groupOutfiles))
+        else:
+            with ProcessPoolExecutor(max_workers=nJobs) as pool:
+                results = list(pool.map(self.convertBoth,files,outfiles,groupOutfiles))
+        return dict(zip(files,results))
+
+    def readLong(self,file):
+        '''
+        Reads the long thin excel file and swaps the numerical codes for the
+        category names
+        Inputs:
+            -file: the full filepath to the file we want to read
+        Returns:
+            - the long format data frame
+        '''
+        #Only read the columns the conversion uses. The codes are left
+        #   without a dtype since a blank cell can't be an integer
+        df = ExcelReader().read(file,columns=['Group','Subject','Coherence','Connection','Condition'],
+                                dtypes={'Subject':'str','Coherence':'float64'})
 
         #Values to replace for the numerical
         connections = ['SMA-Motor','SMA-Visual','Motor-Visual']
         conditions = ['Sham','Anode','Cathode','Visual','Sham Baseline']
-        groups = ['Control','Patient']
-
-        #Change numerical values to the category names
-        #Change connections
-        change = partial(self.changeValues,values=connections,unique=df['Connection'].unique())
-        df['Connection'] = df['Connection'].apply(change)
-        #change conditions
-        change = partial(self.changeValues,values=conditions,unique=df['Condition'].unique())
-        df['Condition'] = df['Condition'].apply(change)
-        #change groups
-        #change = partial(self.changeValues,values=groups,unique=df['Group'].unique())
-        #df['Group'] = df['Group'].apply(change) 
 
+        #Change numerical values to the category names, in the order the
+        #   codes first appear. Blank cells stay blank
+        df['Connection'] = df['Connection'].map(dict(zip(df['Connection'].dropna().unique(),connections)))
+        df['Condition'] = df['Condition'].map(dict(zip(df['Condition'].dropna().unique(),conditions)))
+        return df
+
+    def toShortFat(self,df,includeGroup=False):
+        '''
+        Pivots the long format data into the short-fat format
+        Inputs:
+            -df: a long format data frame from readLong
+            -includeGroup: whether to add the Group column
+        Returns:
+            - the short-fat data frame with one row per subject
+        '''
         #We want to get all of the unique values in the columns
         #Get a list of the subjects
         subjects = df['Subject'].unique()
@@ -49,52 +135,67 @@ class ShortFatConverter:
         #conditions = df['Condition'].unique()#This will include sham baseline
         conditions = ['Sham','Anode','Cathode','Visual','Sham Baseline']
 
+        #Pivot every subject,condition,connection cell out in one pass. If
+        #   a cell has more than one row we keep the first one
+        cells = df.drop_duplicates(['Subject','Condition','Connection'])
+        outputDF = cells.pivot(index='Subject',columns=['Condition','Connection'],values='Coherence')
+        #Put the rows and columns back in the order the loop used to create
+        #   them in. Cells that don't exist are left blank
+        columns = pd.MultiIndex.from_tuples([(cond,conn) for conn in connections for cond in conditions])
+        outputDF = outputDF.reindex(index=subjects,columns=columns)
+        outputDF.columns = ["{}_{}_Coherence".format(cond,conn) for cond,conn in outputDF.columns]
+        outputDF.index.name = None
+        if includeGroup:
+            #The group codes are written as integers (ex. 1) and a missing
+            #   one is left blank. The loop this replaced wrote 1.0 for
+            #   subjects with no blank cells and 1 for the rest
+            group = df.drop_duplicates('Subject').set_index('Subject')['Group'].astype('Int64')
+            outputDF.insert(0,'Group',group.reindex(subjects))
 
-        #The idea is to iterate through each of the subjects,conditions,connections
-        #   and create an entry in a dictionary to then save
-        output = {}#create an empty dict to store our data
-        for sub in subjects:
-            output[sub] = {}
-            for conn in connections:
-                for cond in conditions:
-                    #Filter out the dataset so we find what we need
-                    data = df[(df['Subject']==sub) & (df['Connection']==conn) & (df['Condition']==cond)] 
-                    if DEBUG:
-                        print(data.head())
-                    if includeGroup:
-                        try:
-                            output[sub]["Group"] = int(data['Group'].values[0])
-                        except IndexError:
-                            if "Group" in output[sub]:
-                                #If it has the key then we also want to check 
-                                #   if the value is correct
-                                if output[sub]["Group"] != '':
-                                    #don't do anything to the current value
-                                    pass
-                                else:
-                                    output[sub]["Group"] = ''
-                    try:
-                        output[sub]["{}_{}_Coherence".format(cond,conn)] = data['Coherence'].values[0]
-                    except IndexError:
-                        #We don't seem to have a value here so we will just leave blank
-                        output[sub]["{}_{}_Coherence".format(cond,conn)] = ''
-
-
-        #Now we can convert this into a df and save it
-        outputDF = pd.DataFrame.from_dict(output)
-        outputDF = outputDF.transpose()
         if DEBUG:
             print(outputDF.head())
+        return outputDF
 
-
-        #Now we can save it 
-        outputDF.to_csv(outfile)
-
-                        
-
-         
-    def changeValues(self,x,values=None,unique=None):
-        return values[np.where(unique==x)[0][0]]
+    def toLong(self,file):
+        '''
+        The inverse of convert. Reads a short-fat csv back into the long thin
+        format with the category names, so it can be grouped without going
+        back to the excel file
+        Inputs:
+            -file: the full filepath to the short-fat csv
+        Returns:
+            - a data frame with the columns Subject, Coherence, Connection,
+                Condition and Group (if the file has it). Blank cells are
+                dropped
+        '''
+        df = pd.read_csv(file,index_col=0)
+        df.index.name = 'Subject'
+        df.columns.name = 'Column'
+        idVars = ['Group'] if 'Group' in df.columns else []
+        #Stack row by row so subjects stay in the order of the file
+        longDF = df.set_index(idVars,append=True).stack().rename('Coherence')
+        longDF = longDF.dropna().reset_index()
+        parts = longDF['Column'].str.rsplit('_',n=2,expand=True)
+        longDF['Condition'] = parts[0]
+        longDF['Connection'] = parts[1]
+        return longDF[idVars+['Subject','Coherence','Connection','Condition']]
+
+    def summarise(self,longDF,groups=['Control','Patient']):
+        '''
+        Finds the mean and SEM coherence for every group,condition and
+        connection the same way Coherence Plots.ipynb does
+        Inputs:
+            -longDF: a long format data frame from readLong or toLong
+            -groups: the names to give the group codes, in the order the
+                codes first appear
+        Returns:
+            - a data frame indexed by Group,Condition,Connection with the
+                columns mean and sem
+        '''
+        longDF = longDF.copy()
+        longDF['Group'] = longDF['Group'].map(dict(zip(longDF['Group'].dropna().unique(),groups)))
+        grouped = longDF.groupby(['Group','Condition','Connection'])['Coherence']
+        return grouped.agg(['mean','sem'])
 
 
        
@@ -105,13 +206,9 @@ if __name__ == '__main__':
     conv = ShortFatConverter()
 
     file = "Coherence results_controls and patients.xlsx"
-    outfile = "{}_SHORTFAT.csv".format(file.split('.')[0])
-
-    conv.convert(file,outfile)
 
-    #Do the same conversion but with the group names
-    outfile = "{}_SHORTFATwithGroupNames.csv".format(file.split('.')[0])
-    
-    conv.convert(file,outfile,includeGroup=True)
+    #Create the outputs with and without the group names from one read
+    conv.convertBoth(file)
 
-        
+    #To convert every export in a folder at once
+    #conv.convertBatch(os.getcwd())
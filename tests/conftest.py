@@ -0,0 +1,46 @@
+import os
+import sys
+import shutil
+import pytest
+
+#The packages are imported from the repository root, the same way the scripts
+#   run them
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(REPO_DIR,'data')
+if REPO_DIR not in sys.path:
+    sys.path.insert(0,REPO_DIR)
+
+
+def writeSyntheticData(dataDir,subjects=[('AAA','PATIENT'),('BBB','CONTROL')],trials=4,seed=0):
+    '''
+    The raw excel files aren't checked in, so this writes a small one with the
+    same layout: 3 blocks of 12 runs for every subject and condition, with
+    the random sequence on runs 1 and 10 of each block. The NormalizedData
+    workbook is made from it and the checked-in EEG data is copied over
+    '''
+    import numpy as np
+    import pandas as pd
+    from DataProcessing.RTNormalization import RTNormalization
+    rng = np.random.default_rng(seed)
+    rows = []
+    for code,group in subjects:
+        for cond in ['Anod','Cath','Sham','Vertex']:
+            for run in range(1,37):
+                task = 'RANDOM' if (run - 1) % 12 in [0,9] else 'FIXED'
+                for trial in range(1,trials + 1):
+                    rows.append({'SUBJECT':"{}_{}_{}".format(code,cond,group),'GROUP':group,
+                                 'BLOCK':"Block{}".format((run - 1)//12 + 1),'TASK':task,'CONDITION':cond,
+                                 'RUN':"Run{}".format(run),'TRIAL':"Trial{}".format(trial),
+                                 'LOG_RT':rng.normal(2.7 if task == 'RANDOM' else 2.6,0.1)})
+    os.makedirs(dataDir,exist_ok=True)
+    pd.DataFrame(rows).to_excel(os.path.join(dataDir,'SyntheticRT.xlsx'),index=False)
+    RTNormalization().writeNormalizedData(dataDir,os.path.join(dataDir,'NormalizedData'))
+    eegDir = os.path.join('EEG Data','TSE paper2')
+    shutil.copytree(os.path.join(DATA_DIR,eegDir),os.path.join(dataDir,eegDir),
+                    ignore=shutil.ignore_patterns('eegWindowAvgs.csv','.DS_Store'))
+    return dataDir
+
+
+@pytest.fixture(scope='session')
+def syntheticData(tmp_path_factory):
+    return writeSyntheticData(str(tmp_path_factory.mktemp('synthetic') / 'data'))
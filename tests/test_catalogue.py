@@ -0,0 +1,45 @@
+import os
+import shutil
+import pytest
+from conftest import DATA_DIR
+from DataProcessing.TfcCatalogue import TfcCatalogue
+
+EEG_DIR = os.path.join(DATA_DIR,'EEG Data','TSE paper2')
+
+
+def test_bad_directories_fail(tmp_path):
+    with pytest.raises(AssertionError,match='not a directory'):
+        TfcCatalogue().catalogueRows([os.path.join(EEG_DIR,'Mistyped')])
+    with pytest.raises(AssertionError,match='no tfc files'):
+        TfcCatalogue().catalogueRows([str(tmp_path)])
+
+
+def test_empty_catalogue_is_an_issue():
+    import pandas as pd
+    issues = TfcCatalogue().checkCatalogue(pd.DataFrame())
+    assert list(issues['Issue']) == ['Empty']
+
+
+def test_condition_nobody_has_is_missing():
+    tc = TfcCatalogue()
+    catalogue = tc.buildCatalogue([EEG_DIR])
+    catalogue = catalogue[catalogue['Condition'] != 'Visual']
+    issues = tc.checkCatalogue(catalogue)
+    missing = issues[(issues['Issue'] == 'Missing') & (issues['Condition'] == 'Visual')]
+    assert set(missing['Subject']) == set(catalogue['Subject'])
+
+
+def test_group_ignores_folders_above_the_scan(tmp_path):
+    #A checkout under a folder named after a group
+    eegDir = tmp_path / 'patient-study' / 'EEG'
+    for group in ['Controls Source TSE','Patients Source TSE']:
+        (eegDir / group / 'Sham').mkdir(parents=True)
+    tfc = os.path.join(EEG_DIR,'Controls Source TSE','Visual1 and2','DSL_SS_3_Visual1and2_ERA.tfc')
+    shutil.copy(tfc,str(eegDir / 'Controls Source TSE' / 'Sham' / 'AAA_Sham.tfc'))
+    shutil.copy(tfc,str(eegDir / 'Patients Source TSE' / 'Sham' / 'BBB_Sham.tfc'))
+    tc = TfcCatalogue()
+    rows = tc.catalogueRows([str(eegDir)])
+    assert [(r['Subject'],r['Group']) for r in rows] == [('AAA','Control'),('BBB','Patient')]
+    #Scanning a group folder directly still finds its group
+    rows = tc.catalogueRows([str(eegDir / 'Controls Source TSE')])
+    assert [r['Group'] for r in rows] == ['Control']
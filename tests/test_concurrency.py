@@ -0,0 +1,13 @@
+import os
+from DataProcessing.Pipeline import compareConcurrentRun
+
+
+def test_threaded_stages_match_serial(syntheticData,tmp_path):
+    cwd = os.getcwd()
+    different = compareConcurrentRun(syntheticData,str(tmp_path))
+    assert different == []
+    assert os.getcwd() == cwd
+    #Make sure the stages actually wrote something to compare
+    for name in ['serial','threaded']:
+        assert os.path.exists(os.path.join(str(tmp_path),name,'SubjectRTAvgs.csv'))
+        assert os.path.exists(os.path.join(str(tmp_path),name,'EEG Data','TSE paper2','eegWindowAvgs.csv'))
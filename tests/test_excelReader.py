@@ -0,0 +1,18 @@
+import os
+import pandas as pd
+from conftest import DATA_DIR
+from DataWrangler.ExcelReader import ExcelReader
+
+COHERENCE_FILE = os.path.join(DATA_DIR,'coherenceData','Coherence results_controls and patients.xlsx')
+
+
+def test_matches_read_excel():
+    expected = pd.read_excel(COHERENCE_FILE)
+    columns = list(expected.columns[:3])
+    df = ExcelReader(chunkSize=50).read(COHERENCE_FILE,columns=columns)
+    pd.testing.assert_frame_equal(df,expected[columns],check_dtype=False)
+
+
+def test_no_columns():
+    chunks = list(ExcelReader(chunkSize=10).iterChunks(COHERENCE_FILE,columns=[]))
+    assert len(chunks) == 1 and len(chunks[0].columns) == 0
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+from DataProcessing.MassUnivariate import MassUnivariate
+
+MEASURES = ['AvgNormLogRTCathBlock1','AvgNormLogRTShamBlock1','Anode_e0','Sham_e0']
+
+
+def mergedData(n=30,seed=0):
+    '''
+    A small merged dataset with some values missing
+    '''
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.normal(size=(n,len(MEASURES))),columns=MEASURES)
+    df['Cohort'] = np.where(np.arange(n) % 2 == 0,1,2)
+    df['Anode_e0'] += 0.5*df['Cohort']
+    df['Illnessduration'] = df['Anode_e0'] + rng.normal(size=n)
+    df['Ageattest'] = rng.normal(40,10,n)
+    df['ParticipantSES'] = rng.normal(size=n)
+    for i,c in enumerate(MEASURES + ['Illnessduration']):
+        df.loc[[i,i + 7],c] = np.nan
+    return df
+
+
+def test_statistics_match_scipy():
+    df = mergedData()
+    results = MassUnivariate().screen(df).set_index(['Test','Measure','Contrast'])
+    patients = df[df['Cohort'] == 1]
+    controls = df[df['Cohort'] == 2]
+    for c in MEASURES:
+        expected = stats.ttest_ind(patients[c],controls[c],equal_var=False,nan_policy='omit')
+        row = results.loc[('Group',c,'Patient-Control')]
+        np.testing.assert_allclose([row['Statistic'],row['pValue']],[expected.statistic,expected.pvalue])
+    for a,b in [('AvgNormLogRTCathBlock1','AvgNormLogRTShamBlock1'),('Anode_e0','Sham_e0')]:
+        expected = stats.ttest_rel(df[a],df[b],nan_policy='omit')
+        row = results.loc[('Condition',a,"{}-{}".format(a,b))]
+        np.testing.assert_allclose([row['Statistic'],row['pValue']],[expected.statistic,expected.pvalue])
+    for cov in ['Illnessduration','Ageattest','ParticipantSES']:
+        for c in MEASURES:
+            both = df[[cov,c]].dropna()
+            expected = stats.pearsonr(both[cov],both[c])
+            row = results.loc[('Correlation',c,cov)]
+            np.testing.assert_allclose([row['Statistic'],row['pValue']],[expected.statistic,expected.pvalue])
+            assert row['N'] == len(both)
+
+
+def test_corrections_match_scipy():
+    results = MassUnivariate().screen(mergedData())
+    for _,tests in results.groupby('Test'):
+        np.testing.assert_allclose(tests['pFDR'],stats.false_discovery_control(tests['pValue']))
@@ -0,0 +1,17 @@
+import os
+import pytest
+from conftest import DATA_DIR
+from DataProcessing.MergeDatasets import MergeDatasets
+
+
+def test_parquet_matches_csv(tmp_path):
+    pytest.importorskip('pyarrow')
+    mainFile = os.path.join(DATA_DIR,'Combined Data','Updated combined tDCS motor schiz dataset-gs, shortened.xlsx')
+    sources = [('RT',os.path.join(DATA_DIR,'SubjectRTAvgs.csv')),
+               ('WindowAvgs',os.path.join(DATA_DIR,'EEG Data','TSE paper2','eegWindowAvgs.csv')),
+               ('Coherence',os.path.join(DATA_DIR,'coherenceData','Coherence results_controls and patients_SHORTFAT.csv'))]
+    md = MergeDatasets(mainFile,sources,str(tmp_path / 'merged.csv'))
+    md.merge(force=True)
+    #The workbook has date columns mixed with #NULL! cells
+    assert os.path.exists(md.parquetFile())
+    assert md.checkParquet()
@@ -0,0 +1,27 @@
+import os
+import shutil
+import TDCSSRTT
+from conftest import DATA_DIR
+from DataProcessing.Pipeline import loadShortFatConverter
+from TDCSSRTT.Commands import checkImportBudget
+
+
+def test_shortfat_converter_is_loaded_once():
+    assert loadShortFatConverter() is loadShortFatConverter()
+    assert TDCSSRTT.ShortFatConverter is loadShortFatConverter()
+
+
+def test_shortfat_batch_in_worker_processes(tmp_path):
+    #The class has to be pickled for the process pool
+    shutil.copy(os.path.join(DATA_DIR,'coherenceData','Coherence results_controls and patients.xlsx'),tmp_path / 'a.xlsx')
+    outfiles = TDCSSRTT.ShortFatConverter().convertBatch(str(tmp_path),nJobs=2)
+    assert all(os.path.exists(f) for pair in outfiles.values() for f in pair)
+
+
+def test_import_budget():
+    cacheDir = os.path.join(DATA_DIR,'.pipelineCache')
+    existed = os.path.exists(cacheDir)
+    report = checkImportBudget(dataDir=DATA_DIR)
+    assert all(r['Heavy'] == '' for r in report)
+    #Looking at the data shouldn't write into it
+    assert os.path.exists(cacheDir) == existed
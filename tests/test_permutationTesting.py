@@ -0,0 +1,46 @@
+import numpy as np
+from scipy import stats
+from DataProcessing.PermutationTesting import PermutationTesting
+
+#channels x dim1 x dim2, the size of the default ranges
+MAP_SHAPE = (2,24,25)
+
+
+def subjectMaps(codes,seed,shift=0.0):
+    '''
+    Random maps with a block of higher values, so there is a cluster to find
+    '''
+    rng = np.random.default_rng(seed)
+    maps = dict()
+    for code in codes:
+        m = rng.normal(size=MAP_SHAPE)
+        m[0,5:10,5:12] += shift
+        maps[code] = m
+    return maps
+
+
+def test_group_t_map_matches_scipy():
+    patients = subjectMaps(['P{}'.format(i) for i in range(7)],0,shift=1.5)
+    controls = subjectMaps(['C{}'.format(i) for i in range(9)],1)
+    result = PermutationTesting(nPermutations=20,seed=0,nJobs=1).groupTest(patients,controls)
+    expected = stats.ttest_ind(np.stack(list(patients.values())),np.stack(list(controls.values())),equal_var=False)
+    np.testing.assert_allclose(result['tMap'],expected.statistic)
+
+
+def test_paired_t_map_matches_scipy():
+    codes = ['S{}'.format(i) for i in range(8)]
+    active = subjectMaps(codes,0,shift=1.0)
+    sham = subjectMaps(codes + ['Unpaired'],1)
+    result = PermutationTesting(nPermutations=20,seed=0,nJobs=1).conditionTest(active,sham)
+    expected = stats.ttest_rel(np.stack([active[c] for c in codes]),np.stack([sham[c] for c in codes]))
+    np.testing.assert_allclose(result['tMap'],expected.statistic)
+
+
+def test_null_distribution_does_not_depend_on_nJobs():
+    patients = subjectMaps(['P{}'.format(i) for i in range(6)],0,shift=1.5)
+    controls = subjectMaps(['C{}'.format(i) for i in range(6)],1)
+    results = [PermutationTesting(nPermutations=70,seed=3,nJobs=nJobs,chunkSize=25).groupTest(patients,controls)
+               for nJobs in [1,2]]
+    np.testing.assert_array_equal(results[0]['nullDistribution'],results[1]['nullDistribution'])
+    assert len(results[0]['nullDistribution']) == 70
+    assert results[0]['clusters'].equals(results[1]['clusters'])
@@ -0,0 +1,60 @@
+import os
+import shutil
+import pytest
+from DataProcessing.Pipeline import Pipeline
+
+STAGES = ['extractDataPoints','normalize','averageTrials','getGroupAverages','percentFast','combineRTData']
+
+
+def test_rerun_is_all_cache_hits(syntheticData,tmp_path):
+    dataDir = str(tmp_path / 'data')
+    shutil.copytree(syntheticData,dataDir)
+    Pipeline(dataDir).runRT()
+    #Nothing changed, so a second run shouldn't call any of the stages
+    p = Pipeline(dataDir)
+    def fail(*args,**kwargs):
+        raise AssertionError("A stage ran on a rerun with nothing changed")
+    for stage in STAGES:
+        setattr(p,stage,fail)
+    p.runRT()
+    assert os.path.exists(os.path.join(dataDir,'SubjectRTAvgs.csv'))
+
+
+def readOutputs(p):
+    '''
+    Reads the files runRT writes that depend on fastCutOff
+    '''
+    groupDir = os.path.join(p.normSubjectDir,'groupAverageLogRTs','PercentFastGroupAverages')
+    paths = [os.path.join(groupDir,f) for f in sorted(os.listdir(groupDir))]
+    paths.append(os.path.join(p.dataDir,'SubjectRTAvgs.csv'))
+    outputs = dict()
+    for path in paths:
+        with open(path,'rb') as f:
+            outputs[path] = f.read()
+    return outputs
+
+
+def test_switching_arguments_back_restores_outputs(syntheticData,tmp_path):
+    dataDir = str(tmp_path / 'data')
+    shutil.copytree(syntheticData,dataDir)
+    p = Pipeline(dataDir,fastCutOff=-0.275)
+    p.runRT()
+    first = readOutputs(p)
+    Pipeline(dataDir,fastCutOff=0.0).runRT()
+    assert readOutputs(p) != first
+    #This run is all cache hits, so the files from the 0.0 run have to be
+    #   written over
+    Pipeline(dataDir,fastCutOff=-0.275).runRT()
+    assert readOutputs(p) == first
+
+
+def test_normalization_needs_its_own_folder(syntheticData,tmp_path):
+    from DataProcessing.RTNormalization import RTNormalization
+    dataDir = str(tmp_path / 'data')
+    shutil.copytree(syntheticData,dataDir)
+    p = Pipeline(dataDir,normalization=RTNormalization())
+    #Another workbook next to the generated one would double the trials
+    shutil.copy(os.path.join(p.normData,'NormalizedData.xlsx'),os.path.join(p.normData,'Old.xlsx'))
+    with pytest.raises(AssertionError,match='only excel file'):
+        p.runRT()
+    assert not os.path.exists(p.trialDir)
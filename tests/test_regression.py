@@ -0,0 +1,17 @@
+import os
+import pytest
+from conftest import DATA_DIR
+from DataProcessing.RegressionHarness import RegressionHarness
+
+
+def test_missing_baseline_is_an_error(tmp_path):
+    harness = RegressionHarness(DATA_DIR,str(tmp_path),baselineFile=str(tmp_path / 'missing.json'))
+    with pytest.raises(AssertionError,match='no baseline'):
+        harness.run()
+    #Nothing was copied or run
+    assert not os.path.exists(harness.copyDir)
+
+
+@pytest.mark.slow
+def test_golden_outputs(tmp_path):
+    RegressionHarness(DATA_DIR,str(tmp_path)).check()
@@ -0,0 +1,22 @@
+import os
+import pandas as pd
+from conftest import DATA_DIR
+from DataProcessing.Pipeline import loadShortFatConverter
+
+COHERENCE_FILE = os.path.join(DATA_DIR,'coherenceData','Coherence results_controls and patients.xlsx')
+
+
+def test_blank_group_cells(tmp_path):
+    df = pd.read_excel(COHERENCE_FILE)
+    subject = df['Subject'].iloc[0]
+    blank = df.assign(Group=df['Group'].where(df['Subject'] != subject))
+    blank.to_excel(tmp_path / 'blank.xlsx',index=False)
+    converter = loadShortFatConverter()()
+    expected = converter.convertBoth(COHERENCE_FILE,str(tmp_path / 'a.csv'),str(tmp_path / 'aGroup.csv'))
+    outfiles = converter.convertBoth(str(tmp_path / 'blank.xlsx'))
+    #The output without groups never looks at them
+    with open(expected[0],'rb') as a,open(outfiles[0],'rb') as b:
+        assert a.read() == b.read()
+    groups = pd.read_csv(outfiles[1],index_col=0)['Group']
+    assert pd.isna(groups[subject])
+    assert list(groups.drop(subject)) == list(pd.read_csv(expected[1],index_col=0)['Group'].drop(subject))
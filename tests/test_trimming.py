@@ -0,0 +1,51 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from conftest import DATA_DIR
+from DataProcessing.RTTrimming import RTTrimming
+from DataProcessing.TrialFeatures import TrialFeatures
+
+#One run with a far outlier and a smaller one that only shows up once the far
+#   one is excluded, and a run with a single trial
+OUTLIERS = [1.0,1.01,1.02,0.99,0.98,1.03,0.97,1.0,1.01,0.99,1.5,10.0]
+
+
+def outlierTrials():
+    rows = [{'SUBJECT':'AAA_Anod_PATIENT','RUN':'Run1','LOG_RT':x} for x in OUTLIERS]
+    rows.append({'SUBJECT':'AAA_Anod_PATIENT','RUN':'Run2','LOG_RT':5.0})
+    rows.append({'SUBJECT':'AAA_Anod_PATIENT','RUN':'Run2','LOG_RT':np.nan})
+    return pd.DataFrame(rows)
+
+
+def test_exclusion_rules():
+    df = outlierTrials()
+    excluded = lambda trimmer: list(df.index[trimmer.exclusionMask(df)])
+    #The missing RT is always excluded and a single trial has no spread
+    assert excluded(RTTrimming()) == [13]
+    assert excluded(RTTrimming(lower=0.98,upper=6)) == [6,11,13]
+    assert excluded(RTTrimming(rule='sd',threshold=2.5)) == [11,13]
+    assert excluded(RTTrimming(rule='sd',threshold=2.5,iterative=True)) == [10,11,13]
+    assert excluded(RTTrimming(rule='mad',threshold=3)) == [10,11,13]
+
+
+def test_group_averages_are_in_run_order():
+    rows = [{'SUBJECT':"{}_Anod_PATIENT".format(code),'RUN':"Run{}".format(run),'AverageLogRT':run + i}
+            for i,code in enumerate(['AAA','BBB']) for run in range(1,13)]
+    output = RTTrimming().groupAverages(pd.DataFrame(rows))
+    assert list(output.index.get_level_values('RUN')) == ["Run{}".format(run) for run in range(1,13)]
+    assert list(output['GroupAvgLogRT']) == [run + 0.5 for run in range(1,13)]
+
+
+def test_untrimmed_run_averages_match_subject_run_avgs(tmp_path):
+    #Without a rule the averages should be the ones averageTrials wrote
+    trialDir = os.path.join(DATA_DIR,'WrangledData','SUBJECT_RUN')
+    for f in os.listdir(trialDir):
+        if f.startswith('_5796_Anod_PATIENT_'):
+            shutil.copy(os.path.join(trialDir,f),str(tmp_path))
+    trials = TrialFeatures().loadTrials(str(tmp_path))
+    trimmer = RTTrimming()
+    output = trimmer.runAverages(trials,trimmer.exclusionMask(trials))
+    expected = pd.read_csv(os.path.join(trialDir,'subjectRunAvgs','5796_Anod_PATIENT_AveargeRunLogRTs.csv'),index_col=0)
+    assert list(output['RUN']) == list(expected['RUN'])
+    np.testing.assert_allclose(output['AverageLogRT'],expected['AverageLogRT'],rtol=1e-12)